@@ -0,0 +1,242 @@
+import contextlib
+import json
+import os
+import threading
+from datetime import date
+
+import numpy as np
+
+import perf
+from cache import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): the store is then only safe within one process
+    fcntl = None
+
+# --- Incremental local archive store ---
+# Daily archive series are kept on disk as one .npy file per
+# (rounded lat/lon, variable, unit, timezone), next to a small JSON file that
+# records which date ranges have already been downloaded. A request only goes
+# over the wire for the days the store does not hold yet, so a sliding 20-year
+# window costs one small tail fetch instead of the whole history. If the
+# cache dir cannot be written, store() reports it and callers overlay() the
+# fetched data on what read() returns, so nothing fails for lack of disk.
+# The store is safe to share between threads and between processes (e.g.
+# batch_predict workers): each series is read and written under a thread lock
+# plus an flock on its STORE_DIR/<key>.lock file, so read-modify-write of the
+# values and held ranges never interleaves.
+
+STORE_DIR = os.path.join(CACHE_DIR, "archive")
+
+# The archive lags real time by a few days; trailing nulls inside this window
+# are not marked as held so they get re-fetched once the data is published.
+ARCHIVE_LAG_DAYS = 10
+
+COORD_DECIMALS = 2
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _key(lat, lon, variable, unit, timezone):
+    return f"{round(lat, COORD_DECIMALS):.2f}_{round(lon, COORD_DECIMALS):.2f}_{variable}_{unit}_{timezone or 'GMT'}".replace("/", "-")
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _open_lock_file(key):
+    """The lock file handle for a series, or None where file locks are unavailable."""
+    if fcntl is None:
+        return None
+    try:
+        os.makedirs(STORE_DIR, exist_ok=True)
+        return open(os.path.join(STORE_DIR, key + ".lock"), "a")
+    except OSError:
+        # Read-only cache dir: nothing gets written, so there is nothing to protect
+        return None
+
+
+@contextlib.contextmanager
+def _locked(keys, exclusive):
+    """Holds the thread and file locks of keys, in a fixed order; writers lock exclusively, readers shared."""
+    ordered = sorted(set(keys))
+    with contextlib.ExitStack() as stack:
+        for key in ordered:
+            stack.enter_context(_lock_for(key))
+        for key in ordered:
+            handle = _open_lock_file(key)
+            if handle is not None:
+                stack.callback(handle.close)
+                fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def missing_ranges(held, start, end):
+    """Returns the (start, end) ordinal ranges inside [start, end] not covered by held."""
+    gaps = []
+    cursor = start
+    for s, e in sorted(held):
+        if e < cursor:
+            continue
+        if s > end:
+            break
+        if s > cursor:
+            gaps.append((cursor, s - 1))
+        cursor = max(cursor, e + 1)
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def merge_ranges(held, start, end):
+    """Adds [start, end] to a list of ordinal ranges, merging overlapping/adjacent ones."""
+    merged = []
+    for s, e in sorted(held + [(start, end)]):
+        if merged and s <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
+
+
+class _Series:
+    """One on-disk daily series: values indexed by day offset from base."""
+
+    def __init__(self, key):
+        self.values_path = os.path.join(STORE_DIR, key + ".npy")
+        self.meta_path = os.path.join(STORE_DIR, key + ".json")
+        self.base = None
+        self.held = []
+        if os.path.exists(self.meta_path) and os.path.exists(self.values_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self.base = meta["base"]
+            self.held = [tuple(r) for r in meta["held"]]
+
+    def read(self, start, end):
+        """Returns float64 values for ordinals start..end (NaN where not held)."""
+        out = np.full(end - start + 1, np.nan)
+        if self.base is None:
+            return out
+        values = np.load(self.values_path, mmap_mode="r")
+        lo = max(start, self.base)
+        hi = min(end, self.base + len(values) - 1)
+        if lo <= hi:
+            out[lo - start:hi - start + 1] = values[lo - self.base:hi - self.base + 1]
+        return out
+
+    def write(self, start, new_values, held_end):
+        """Stores new_values from ordinal start and marks start..held_end as held; False if the disk write failed."""
+        end = start + len(new_values) - 1
+        if self.base is None:
+            base, values = start, np.full(len(new_values), np.nan)
+        else:
+            old = np.load(self.values_path)
+            base = min(self.base, start)
+            top = max(self.base + len(old) - 1, end)
+            values = np.full(top - base + 1, np.nan)
+            values[self.base - base:self.base - base + len(old)] = old
+        values[start - base:end - base + 1] = new_values
+        if held_end >= start:
+            self.held = merge_ranges(self.held, start, held_end)
+        self.base = base
+
+        try:
+            os.makedirs(STORE_DIR, exist_ok=True)
+            tmp = self.values_path + ".tmp.npy"
+            np.save(tmp, values)
+            os.replace(tmp, self.values_path)
+            with open(self.meta_path + ".tmp", "w") as f:
+                json.dump({"base": self.base, "held": self.held}, f)
+            os.replace(self.meta_path + ".tmp", self.meta_path)
+        except OSError:
+            # Read-only or full cache dir
+            return False
+        return True
+
+
+def _keys(lat, lon, variables, unit, timezone):
+    """Store key for each variable."""
+    return [_key(lat, lon, v, unit, timezone) for v in variables]
+
+
+def missing(lat, lon, start_date, end_date, variables, unit="celsius", timezone=None):
+    """Returns the (start, end) date ranges inside [start_date, end_date] the store does not hold yet."""
+    start = _as_date(start_date).toordinal()
+    end = _as_date(end_date).toordinal()
+    keys = _keys(lat, lon, variables, unit, timezone)
+    with perf.span("archive store plan") as span:
+        gaps = []
+        for key in keys:
+            for gap in missing_ranges(_Series(key).held, start, end):
+                gaps = merge_ranges(gaps, *gap)
+        missing_days = sum(gap_end - gap_start + 1 for gap_start, gap_end in gaps)
+        span.set(cache="hit" if not gaps else "miss" if missing_days > end - start else "partial")
+    return [(date.fromordinal(gap_start), date.fromordinal(gap_end)) for gap_start, gap_end in gaps]
+
+
+def store(lat, lon, start_date, data, variables, unit="celsius", timezone=None):
+    """
+    Writes one archive API response (covering days from start_date on) into the
+    store. Returns False if it could not be written to disk.
+    """
+    gap_start = _as_date(start_date).toordinal()
+    keys = _keys(lat, lon, variables, unit, timezone)
+    fresh_limit = date.today().toordinal() - ARCHIVE_LAG_DAYS
+    daily = data.get("daily", {})
+    saved = True
+    with _locked(keys, exclusive=True):
+        for v, key in zip(variables, keys):
+            values = np.array([np.nan if x is None else x for x in daily.get(v, [])], dtype=float)
+            if len(values) == 0:
+                continue
+            held_end = gap_start + len(values) - 1
+            if held_end > fresh_limit:
+                valid = np.flatnonzero(~np.isnan(values))
+                last_valid = gap_start + int(valid[-1]) if len(valid) else gap_start - 1
+                held_end = max(min(held_end, fresh_limit), last_valid)
+            # Re-open under the lock: another chunk or process may have just extended this series
+            saved = _Series(key).write(gap_start, values, held_end) and saved
+    return saved
+
+
+def read(lat, lon, start_date, end_date, variables, unit="celsius", timezone=None):
+    """
+    Returns what the store holds for [start_date, end_date] in the same shape as an
+    archive API response ({"latitude", "longitude", "daily": {"time", <variables>}}),
+    with None for days it does not hold.
+    """
+    start = _as_date(start_date).toordinal()
+    end = _as_date(end_date).toordinal()
+    keys = _keys(lat, lon, variables, unit, timezone)
+    with perf.span("archive store read"):
+        daily = {"time": [date.fromordinal(d).isoformat() for d in range(start, end + 1)]}
+        with _locked(keys, exclusive=False):
+            for v, key in zip(variables, keys):
+                daily[v] = [None if np.isnan(x) else float(x) for x in _Series(key).read(start, end)]
+    return {"latitude": lat, "longitude": lon, "daily": daily}
+
+
+def overlay(data, start_date, fetched, variables):
+    """Copies the days of an archive API response (covering days from start_date on) into a read() result."""
+    times = data["daily"]["time"]
+    if not times:
+        return data
+    offset = _as_date(start_date).toordinal() - _as_date(times[0]).toordinal()
+    for v in variables:
+        target = data["daily"][v]
+        for i, x in enumerate(fetched.get("daily", {}).get(v, [])):
+            if x is not None and 0 <= offset + i < len(target):
+                target[offset + i] = x
+    return data
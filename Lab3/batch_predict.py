@@ -0,0 +1,252 @@
+"""
+Headless batch forecasts.
+
+Runs the phase3 pipeline (prediction_pipeline.py: fetch 20 years of history,
+summarize, local statistical forecast and, with --narrative, the Gemini
+scenario) for every row of a CSV, across a pool of worker processes.
+
+    python batch_predict.py cities.csv forecasts.csv
+    python batch_predict.py cities.csv forecasts.parquet --workers 8 --narrative
+    python batch_predict.py cities.csv forecasts.csv --resume
+
+The input needs `city` and `date` (YYYY-MM-DD) columns and may have a `unit`
+column (celsius or fahrenheit, default celsius). Rows with a bad date or unit
+are recorded as errors without running. Rows for the same city and unit run
+as one task, so each history is downloaded once. Calls to each upstream are
+capped across the whole pool (--limit).
+
+Finished rows are appended to <output>.progress.jsonl as they complete. With
+--resume, rows already recorded there as "ok" are skipped and only failed or
+missing ones run again (with --narrative, so are ok rows without one). The
+output file is written from that journal at the end (Parquet output needs
+pyarrow); the exit status is 1 if any row failed.
+"""
+import argparse
+import concurrent.futures
+import csv
+import datetime
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import forecast
+import prediction_cache
+import prediction_pipeline
+import retry
+from cache import MISSING
+
+# Calls in flight per upstream across all workers (each worker's own pipeline
+# would otherwise open up to fetch_pipeline.MAX_CONCURRENCY connections)
+DEFAULT_LIMITS = {
+    "open-meteo-geocoding": 4,
+    "open-meteo-archive": 8,
+    "gemini": 2,
+}
+UNITS = ("celsius", "fahrenheit")
+COLUMNS = [
+    "city", "date", "unit", "status", "error", "resolved_name", "latitude", "longitude",
+    "mean", "low", "high", "level", "normal", "trend_per_year", "failed_ranges", "narrative", "sources",
+]
+
+
+# --- Worker process ---
+
+def _init_worker(slots, workers):
+    for name, semaphore in slots.items():
+        retry.upstream(name).share(semaphore, workers)
+
+
+def _narrative(city, date, unit, stats, daily, prediction, api_key):
+    """Gemini scenario for one row, served from the shared prediction cache when possible."""
+    symbol = prediction_pipeline.unit_symbol(unit)
+    summary = prediction_pipeline.summarize(city, daily["time"], stats, prediction, unit)
+    key = prediction_pipeline.cache_key(city, date, symbol, summary)
+    narrative = prediction_cache.shared_cache.get(key)
+    if narrative is MISSING:
+        payload = prediction_pipeline.build_payload(city, date, summary, symbol)
+        narrative = prediction_pipeline.narrate(payload, api_key)
+        prediction_cache.shared_cache.set(key, narrative)
+    return narrative
+
+
+def run_task(city, unit, dates, api_key=None):
+    """
+    Forecasts every date for one city and unit; returns one result row per date.
+    Errors become rows with status "error" instead of failing the task.
+    """
+    rows = [{"city": city, "date": date, "unit": unit} for date in dates]
+    try:
+        match, daily, failed_ranges = prediction_pipeline.fetch_history(city, unit)
+        stats, model = prediction_pipeline.fit_history(daily)
+    except Exception as e:
+        for row in rows:
+            row.update(status="error", error=f"{type(e).__name__}: {e}")
+        return rows
+
+    for row in rows:
+        row.update(resolved_name=match["name"], latitude=match["latitude"], longitude=match["longitude"],
+                   failed_ranges=json.dumps(failed_ranges) if failed_ranges else "")
+        try:
+            prediction = forecast.predict(model, row["date"])
+            row.update({k: prediction[k] for k in ("mean", "low", "high", "level", "normal", "trend_per_year")})
+            if api_key:
+                narrative = _narrative(city, row["date"], unit, stats, daily, prediction, api_key)
+                row.update(narrative=narrative["text"], sources=json.dumps(narrative["sources"]))
+            row["status"] = "ok"
+        except Exception as e:
+            row.update(status="error", error=f"{type(e).__name__}: {e}")
+    return rows
+
+
+# --- Input, journal and output ---
+
+def check_request(date, unit):
+    """Returns (ISO date, None) for a valid row, or (date as given, error message)."""
+    if unit not in UNITS:
+        return date, f"ValueError: unit must be {' or '.join(UNITS)}, not {unit!r}"
+    try:
+        return datetime.date.fromisoformat(date).isoformat(), None
+    except ValueError:
+        return date, f"ValueError: date must be YYYY-MM-DD, not {date!r}"
+
+
+def read_requests(path):
+    """
+    ([(city, date, unit)], {(city, date, unit): error row}) from the input CSV:
+    every row in file order without duplicates, and the ones that cannot run.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = {"city", "date"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path} is missing column(s): {', '.join(sorted(missing))}")
+        requests, invalid = [], {}
+        for row in reader:
+            city, date = row["city"].strip(), row["date"].strip()
+            unit = (row.get("unit") or "celsius").strip().lower()
+            if not (city and date):
+                continue
+            date, error = check_request(date, unit)
+            requests.append((city, date, unit))
+            if error:
+                invalid[(city, date, unit)] = {"city": city, "date": date, "unit": unit, "status": "error", "error": error}
+    return list(dict.fromkeys(requests)), invalid
+
+
+def read_journal(path):
+    """Latest journal row per (city, date, unit); a truncated last line is ignored."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            done[(row["city"], row["date"], row["unit"])] = row
+    return done
+
+
+def write_output(path, rows):
+    if path.endswith(".parquet"):
+        import pandas as pd
+
+        pd.DataFrame(rows, columns=COLUMNS).to_parquet(path, index=False)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def group_tasks(requests):
+    """{(city, unit): [dates]} so each city's history is fetched by one worker."""
+    tasks = {}
+    for city, date, unit in requests:
+        tasks.setdefault((city, unit), []).append(date)
+    return tasks
+
+
+def parse_limits(values):
+    limits = dict(DEFAULT_LIMITS)
+    for value in values:
+        name, _, count = value.partition("=")
+        if name not in limits or not count.isdigit() or int(count) < 1:
+            raise ValueError(f"bad --limit {value!r}; expected one of {', '.join(limits)}=N")
+        limits[name] = int(count)
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast many city/date rows with the phase3 pipeline.")
+    parser.add_argument("input", help="CSV with city, date and optional unit columns")
+    parser.add_argument("output", help="results file; .parquet writes Parquet, anything else CSV")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="worker processes")
+    parser.add_argument("--limit", action="append", default=[], metavar="UPSTREAM=N",
+                        help=f"calls in flight per upstream across workers (defaults: "
+                             f"{', '.join(f'{k}={v}' for k, v in DEFAULT_LIMITS.items())})")
+    parser.add_argument("--narrative", action="store_true", help="also ask Gemini for a scenario (needs GEMINI_API_KEY)")
+    parser.add_argument("--resume", action="store_true", help="skip rows the progress journal already has as ok")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("GEMINI_API_KEY") if args.narrative else None
+    if args.narrative and not api_key:
+        parser.error("--narrative needs GEMINI_API_KEY in the environment")
+    try:
+        limits = parse_limits(args.limit)
+        requests, invalid = read_requests(args.input)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    journal_path = args.output + ".progress.jsonl"
+    done = read_journal(journal_path) if args.resume else {}
+    if not args.resume and os.path.exists(journal_path):
+        os.remove(journal_path)
+
+    def finished(row):
+        # Rows from a run without --narrative are redone when it is added
+        return row.get("status") == "ok" and (not args.narrative or "narrative" in row)
+
+    todo = [r for r in requests if r not in invalid and not finished(done.get(r, {}))]
+    tasks = group_tasks(todo)
+    print(f"{len(requests)} rows, {len(invalid)} invalid, {len(requests) - len(todo) - len(invalid)} already done, "
+          f"{len(todo)} to run as {len(tasks)} city tasks on {args.workers} workers")
+
+    workers = max(1, min(args.workers, len(tasks)))
+    # spawn: workers must not inherit the parent's threads (pipeline loop, HTTP pools)
+    context = multiprocessing.get_context("spawn")
+    slots = {name: context.BoundedSemaphore(count) for name, count in limits.items()}
+    started = time.perf_counter()
+    with open(journal_path, "a", encoding="utf-8") as journal, \
+            concurrent.futures.ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                                   initargs=(slots, workers)) as pool:
+        for key, row in invalid.items():
+            journal.write(json.dumps(row) + "\n")
+            done[key] = row
+        journal.flush()
+        futures = {pool.submit(run_task, city, unit, dates, api_key): city for (city, unit), dates in tasks.items()}
+        for i, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            rows = future.result()
+            for row in rows:
+                journal.write(json.dumps(row, default=str) + "\n")
+                done[(row["city"], row["date"], row["unit"])] = row
+            journal.flush()
+            errors = [row["error"] for row in rows if row["status"] != "ok"]
+            note = f"{len(errors)} failed: {errors[0]}" if errors else "ok"
+            print(f"[{i}/{len(tasks)}] {futures[future]} ({len(rows)} dates): {note}", flush=True)
+
+    results = [done[r] for r in requests if r in done]
+    write_output(args.output, results)
+    failed = sum(row["status"] != "ok" for row in results) - len(invalid)
+    print(f"Wrote {len(results)} rows to {args.output} in {time.perf_counter() - started:.1f}s"
+          + (f"; {len(invalid)} invalid input rows" if invalid else "")
+          + (f"; {failed} failed, rerun with --resume to retry them" if failed else ""))
+    if failed or invalid:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Per-page latency benchmarks.
+
+Runs every page headlessly through streamlit.testing.v1.AppTest against the
+local stand-in (standin_server.py), so only our own overhead is measured. Each
+scenario runs in a fresh process with an empty cache directory and reports,
+for every rerun, wall time, peak traced memory and upstream call counts.
+
+    python benchmark.py                      # run and compare with the baseline
+    python benchmark.py --update-baseline    # run and store a new baseline
+    python benchmark.py weather_history_30y chatbot_10_turns --repeat 5
+
+Exits with status 1 when a scenario regresses past --threshold.
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "benchmark_baseline.json")
+TIMEOUT = 300
+API_KEY = "benchmark-key"
+
+CHAT_QUESTIONS = [
+    "What was the weather in Atlanta last week?",
+    "How about in celsius?",
+    "What will the weather be like in Paris next month?",
+    "Compare that with Tokyo",
+    "What was the temperature in Chicago on 2024-01-15?",
+    "Was it cold in Denver yesterday?",
+    "What is the weather forecast for London tomorrow?",
+    "And for the same dates in Sydney?",
+    "Is it a good week for a picnic in Boston?",
+    "Summarize what we talked about",
+]
+
+
+# --- Scenarios ---
+# Each scenario takes a step(label, action) callback; step runs the action and
+# records one rerun. Actions set widget values and then call at.run().
+
+def scenario_home(app, step):
+    at = app("Home_Page.py")
+    step("load", at.run)
+
+
+def scenario_lucas_portfolio(app, step):
+    at = app("pages/1Lucas' Portfolio.py")
+    step("load", at.run)
+
+
+def scenario_pranav_portfolio(app, step):
+    at = app("pages/2PranavPortfolio.py")
+    step("load", at.run)
+
+
+def scenario_weather_history_30y(app, step):
+    at = app("pages/2Weather History.py")
+    step("load", at.run)
+
+    def search():
+        at.text_input[0].set_value("Atlanta")
+        at.date_input[0].set_value(datetime.date(1995, 1, 1))
+        at.date_input[1].set_value(datetime.date(2024, 12, 31))
+        at.button[0].click().run()
+
+    step("30-year range", search)
+    step("same range again", lambda: at.button[0].click().run())
+
+
+def scenario_weather_history_compare_5(app, step):
+    at = app("pages/2Weather History.py")
+    step("load", at.run)
+    step("compare mode", lambda: at.checkbox[0].check().run())
+
+    def search():
+        at.text_input[0].set_value("Atlanta, Chicago, Denver, Seattle, Miami")
+        at.date_input[0].set_value(datetime.date(1995, 1, 1))
+        at.date_input[1].set_value(datetime.date(2024, 12, 31))
+        at.button[0].click().run()
+
+    step("5 cities, 30 years", search)
+
+
+def scenario_long_range_20y(app, step):
+    at = app("pages/Long-Range Weather Predictor.py")
+    at.secrets["GEMINI_API_KEY"] = API_KEY
+    step("load", at.run)
+
+    def predict():
+        at.text_input[0].set_value("Atlanta")
+        at.slider[0].set_value(200)
+        at.button[0].click().run()
+
+    step("20-year prediction", predict)
+
+    def explain():
+        at.checkbox[0].check()
+        at.button[0].click().run()
+
+    step("with AI explanation", explain)
+    step("cached explanation", lambda: at.button[0].click().run())
+
+
+def scenario_phase3_20y(app, step):
+    at = app("phase3.py")
+    step("load", at.run)
+
+    def forecast():
+        at.sidebar.text_input[0].set_value("London")
+        at.sidebar.button[0].click().run()
+
+    step("20-year forecast", forecast)
+    step("cached forecast", lambda: at.sidebar.button[0].click().run())
+
+
+def scenario_chatbot_10_turns(app, step):
+    at = app("pages/Weather Chatbot.py")
+    at.secrets["GEMINI_API_KEY"] = API_KEY
+    step("load", at.run)
+    for i, question in enumerate(CHAT_QUESTIONS, 1):
+        step(f"turn {i}", lambda q=question: at.text_input[0].set_value(q).run())
+
+
+def scenario_phase4_10_turns(app, step):
+    at = app("phase4.py")
+    step("load", at.run)
+    step("api key", lambda: at.sidebar.text_input[0].set_value(API_KEY).run())
+    step("list models", lambda: at.sidebar.button[0].click().run())
+    step("list models again", lambda: at.sidebar.button[0].click().run())
+    for i, question in enumerate(CHAT_QUESTIONS, 1):
+        step(f"turn {i}", lambda q=question: at.chat_input[0].set_value(q).run())
+
+
+SCENARIOS = {
+    name[len("scenario_"):]: fn for name, fn in globals().items() if name.startswith("scenario_")
+}
+
+
+# --- Child process: run one scenario ---
+
+def run_scenario(name, latency_ms):
+    """Runs one scenario in this process and returns its list of rerun records."""
+    import standin_server
+
+    server = standin_server.start(latency_ms=latency_ms)
+    os.environ.update(standin_server.env_for(server.url))
+    os.environ["GEMINI_API_KEY"] = API_KEY
+
+    from streamlit.testing.v1 import AppTest
+
+    def app(path):
+        return AppTest.from_file(os.path.join(HERE, path), default_timeout=TIMEOUT)
+
+    reruns = []
+
+    def step(label, action):
+        with server.state.lock:
+            server.state.calls.clear()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        at = action()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        with server.state.lock:
+            calls = dict(server.state.calls)
+        errors = [e.value for e in at.exception] + [e.value for e in at.error] if at is not None else []
+        reruns.append({
+            "label": label,
+            "wall_ms": round(elapsed * 1000, 1),
+            "peak_kb": round(peak / 1024),
+            "calls": calls,
+            "errors": [str(e)[:200] for e in errors],
+        })
+
+    tracemalloc.start()
+    SCENARIOS[name](app, step)
+    tracemalloc.stop()
+    server.shutdown()
+    return reruns
+
+
+def run_isolated(name, latency_ms):
+    """Runs a scenario in a fresh interpreter with an empty cache directory."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, LAB3_CACHE_DIR=cache_dir)
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", name, "--latency-ms", str(latency_ms)],
+            cwd=HERE, env=env, capture_output=True, text=True,
+        )
+    if result.returncode != 0:
+        return {"failed": (result.stderr.strip().splitlines() or ["no output"])[-1]}
+    return {"reruns": json.loads(result.stdout.strip().splitlines()[-1])}
+
+
+def combine(runs):
+    """Median wall time and peak memory per rerun across repeated runs of one scenario."""
+    combined = []
+    for reruns in zip(*(run["reruns"] for run in runs)):
+        first = reruns[0]
+        combined.append({
+            "label": first["label"],
+            "wall_ms": round(statistics.median(r["wall_ms"] for r in reruns), 1),
+            "peak_kb": round(statistics.median(r["peak_kb"] for r in reruns)),
+            "calls": first["calls"],
+            "errors": first["errors"],
+        })
+    return combined
+
+
+# --- Baselines ---
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(name, reruns, baseline, threshold, min_ms):
+    """Returns regression messages for one scenario against its baseline reruns."""
+    problems = []
+    previous = {r["label"]: r for r in baseline.get(name, [])}
+    for rerun in reruns:
+        old = previous.get(rerun["label"])
+        if old is None:
+            continue
+        label = f"{name} / {rerun['label']}"
+        if rerun["wall_ms"] > max(old["wall_ms"] * (1 + threshold), old["wall_ms"] + min_ms):
+            problems.append(f"{label}: wall time {old['wall_ms']} -> {rerun['wall_ms']} ms")
+        if rerun["peak_kb"] > old["peak_kb"] * (1 + threshold) and rerun["peak_kb"] - old["peak_kb"] > 256:
+            problems.append(f"{label}: peak memory {old['peak_kb']} -> {rerun['peak_kb']} KB")
+        for upstream, count in rerun["calls"].items():
+            if count > old["calls"].get(upstream, 0):
+                problems.append(f"{label}: {upstream} calls {old['calls'].get(upstream, 0)} -> {count}")
+    return problems
+
+
+def print_report(name, reruns):
+    print(f"\n{name}")
+    for r in reruns:
+        calls = ", ".join(f"{k}={v}" for k, v in sorted(r["calls"].items())) or "-"
+        print(f"  {r['label']:<20} {r['wall_ms']:>9.1f} ms {r['peak_kb']:>9} KB peak   calls: {calls}")
+        for error in r["errors"]:
+            print(f"  {'':<20} error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-page latency benchmarks against the local stand-in.")
+    parser.add_argument("scenarios", nargs="*", help=f"default: all of {', '.join(SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; medians are reported")
+    parser.add_argument("--latency-ms", type=float, default=0, help="stand-in latency per upstream call")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-ms", type=float, default=50, help="ignore slowdowns smaller than this")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.latency_ms)))
+        return
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    baseline = load_baseline(args.baseline)
+    results, problems = {}, []
+    for name in names:
+        runs = [run_isolated(name, args.latency_ms) for _ in range(args.repeat)]
+        failed = [run["failed"] for run in runs if "failed" in run]
+        if failed:
+            print(f"\n{name}\n  failed: {failed[0]}")
+            problems.append(f"{name}: failed to run")
+            continue
+        results[name] = combine(runs)
+        print_report(name, results[name])
+        problems += compare(name, results[name], baseline, args.threshold, args.min_ms)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if problems:
+        print("\nRegressions:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("\nNo regressions." if baseline else "\nNo baseline yet; run with --update-baseline to store one.")
+
+
+if __name__ == "__main__":
+    main()
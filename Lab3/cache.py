@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Two-tier process cache ---
+# An in-memory LRU in front of a small SQLite table, with a per-entry TTL.
+# Values must be JSON serializable. Shared by every session in the process.
+# The disk tier is best-effort: when it is locked by another process for
+# longer than BUSY_TIMEOUT (or otherwise fails), reads miss and writes stay in
+# memory only, so a cache never fails the work it is caching.
+
+CACHE_DIR = os.environ.get("LAB3_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+# Seconds to wait for another process's write lock on the SQLite file
+BUSY_TIMEOUT = float(os.environ.get("LAB3_CACHE_BUSY_TIMEOUT", 5))
+
+MISSING = object()
+
+
+class TieredCache:
+    """
+    LRU memory tier backed by an on-disk SQLite tier, both honoring a TTL in seconds.
+    If max_entries is set, the SQLite tier keeps only that many most recently written entries.
+    """
+
+    def __init__(self, name, ttl=7 * 24 * 3600, maxsize=1024, path=None, max_entries=None):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.max_entries = max_entries
+        self.path = path or os.path.join(CACHE_DIR, "cache.sqlite3")
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        """Opens the SQLite tier lazily; returns None if the disk is unavailable."""
+        if self._db is None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "namespace TEXT, key TEXT, value TEXT, expires REAL, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                db.commit()
+                self._db = db
+            except (OSError, sqlite3.Error):
+                self._db = False
+                return None
+            self._write(db, [("DELETE FROM entries WHERE expires <= ?", (time.time(),))])
+        return self._db or None
+
+    @staticmethod
+    def _write(db, statements):
+        """Runs (sql, params) statements in one transaction; returns False if it failed (e.g. database is locked)."""
+        try:
+            for sql, params in statements:
+                db.execute(sql, params)
+            db.commit()
+            return True
+        except sqlite3.Error:
+            try:
+                db.rollback()
+            except sqlite3.Error:
+                pass
+            return False
+
+    def get(self, key, default=MISSING):
+        """Returns the cached value, or default if absent or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+            db = self._connect()
+            if db is None:
+                return default
+            try:
+                row = db.execute(
+                    "SELECT value, expires FROM entries WHERE namespace = ? AND key = ?",
+                    (self.name, key),
+                ).fetchone()
+            except sqlite3.Error:
+                return default
+            if row is None or row[1] <= now:
+                return default
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Stores a value in both tiers; if the disk write fails, the value is kept in memory only."""
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires)
+            db = self._connect()
+            if db is None:
+                return
+            statements = [(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                (self.name, key, json.dumps(value), expires),
+            )]
+            if self.max_entries:
+                statements.append((
+                    "DELETE FROM entries WHERE namespace = ? AND key NOT IN ("
+                    "SELECT key FROM entries WHERE namespace = ? ORDER BY expires DESC LIMIT ?)",
+                    (self.name, self.name, self.max_entries),
+                ))
+            self._write(db, statements)
+
+    def clear(self):
+        """Drops every entry in this cache's namespace."""
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is None:
+                return
+            self._write(db, [("DELETE FROM entries WHERE namespace = ?", (self.name,))])
+
+    def _remember(self, key, value, expires):
+        self._memory[key] = (value, expires)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
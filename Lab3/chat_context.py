@@ -0,0 +1,89 @@
+import re
+
+# --- Token-budgeted conversation context ---
+# Keeps the chatbot prompt bounded: the last few turns are sent verbatim, older
+# turns are folded into a running summary, and the resolved city, dates and
+# unit are carried as structured state so follow-ups ("same city", "in
+# Celsius") still resolve without resending the whole transcript.
+
+CHARS_PER_TOKEN = 4
+SUMMARY_SNIPPET_CHARS = 160
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def summarize_turns(summary, messages):
+    """
+    Default summarizer: appends a one-line digest of each dropped message
+    (the first sentence, clipped) to the running summary.
+    """
+    lines = [summary] if summary else []
+    for msg in messages:
+        first = _SENTENCE_END.split(msg["content"].strip(), maxsplit=1)[0]
+        if len(first) > SUMMARY_SNIPPET_CHARS:
+            first = first[:SUMMARY_SNIPPET_CHARS].rstrip() + "..."
+        lines.append(f"- {msg['role'].capitalize()}: {first}")
+    return "\n".join(lines)
+
+
+class ConversationContext:
+    """
+    Rolling conversation context with a token budget.
+
+    keep_turns messages are always kept verbatim (budget permitting); older
+    messages are compressed by summarizer(summary, dropped_messages) -> summary,
+    and the summary itself is clipped to its share of the budget.
+    """
+
+    def __init__(self, token_budget=1500, keep_turns=6, summary_share=0.3, summarizer=summarize_turns):
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summary_share = summary_share
+        self.summarizer = summarizer
+        self.messages = []
+        self.summary = ""
+        self.state = {}
+
+    def add(self, role, content):
+        self.messages.append({"role": role, "content": content})
+        self._compact()
+
+    def update_state(self, **values):
+        """Records resolved query fields (city, lat, lon, start_date, end_date, unit, ...)."""
+        self.state.update({k: v for k, v in values.items() if v is not None})
+
+    def render(self):
+        """Returns the context block to prepend to the next prompt."""
+        parts = []
+        if self.state:
+            fields = "\n".join(f"- {k}: {v}" for k, v in self.state.items())
+            parts.append(f"Current query state (from earlier turns):\n{fields}")
+        if self.summary:
+            parts.append(f"Summary of earlier conversation:\n{self.summary}")
+        if self.messages:
+            recent = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in self.messages)
+            parts.append(f"Recent conversation:\n{recent}")
+        return "\n\n".join(parts)
+
+    def tokens(self):
+        return estimate_tokens(self.render())
+
+    def _compact(self):
+        dropped = []
+        while len(self.messages) > self.keep_turns:
+            dropped.append(self.messages.pop(0))
+        while len(self.messages) > 1 and self.tokens() > self.token_budget:
+            dropped.append(self.messages.pop(0))
+        if dropped:
+            self.summary = self.summarizer(self.summary, dropped)
+
+        summary_limit = int(self.token_budget * self.summary_share) * CHARS_PER_TOKEN
+        if len(self.summary) > summary_limit:
+            # Keep the most recent part of the summary, starting at a line boundary
+            clipped = self.summary[-summary_limit:]
+            self.summary = clipped[clipped.find("\n") + 1:] if "\n" in clipped else clipped
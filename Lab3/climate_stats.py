@@ -0,0 +1,89 @@
+import numpy as np
+
+# --- Vectorized climatology statistics ---
+# All weather pages summarize their archive series through summarize() so the
+# numbers they show (and send to Gemini) are computed the same way, in NumPy,
+# and with the archive's null days skipped instead of crashing sum().
+
+
+def as_array(values):
+    """Converts an archive value list (which may contain None) to a float array with NaNs."""
+    return np.array(values, dtype=float)
+
+
+def day_of_year(dates):
+    """Returns the 1-based day of year for each ISO date string."""
+    days = np.array(dates, dtype="datetime64[D]")
+    return (days - days.astype("datetime64[Y]")).astype(int) + 1
+
+
+def day_of_year_normals(values, dates):
+    """Mean value for each day of year (index 0 is Jan 1, 365 is Dec 31 of leap years); NaN where unseen."""
+    values = as_array(values)
+    doy = day_of_year(dates) - 1
+    valid = ~np.isnan(values)
+    sums = np.bincount(doy[valid], weights=values[valid], minlength=366)
+    counts = np.bincount(doy[valid], minlength=366)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def summarize(values, dates=None, trend_years=5, percentiles=(10, 50, 90)):
+    """
+    Summarizes a daily series in one pass. Returns a dict with count, missing,
+    mean, min, max, total, percentiles, slope_per_year (least-squares trend),
+    first_period_mean/last_period_mean/period_change (first vs last
+    trend_years of data) and, when dates are given, day-of-year normals.
+    Statistics that cannot be computed are None.
+    """
+    values = as_array(values)
+    valid = ~np.isnan(values)
+    count = int(valid.sum())
+    stats = {
+        "count": count,
+        "missing": int(len(values) - count),
+        "mean": None,
+        "min": None,
+        "max": None,
+        "total": None,
+        "percentiles": {},
+        "slope_per_year": None,
+        "first_period_mean": None,
+        "last_period_mean": None,
+        "period_change": None,
+        "normals": None,
+    }
+    if count == 0:
+        return stats
+
+    clean = values[valid]
+    stats["mean"] = float(clean.mean())
+    stats["min"] = float(clean.min())
+    stats["max"] = float(clean.max())
+    stats["total"] = float(clean.sum())
+    stats["percentiles"] = dict(zip(percentiles, np.percentile(clean, percentiles).tolist()))
+
+    if dates is not None:
+        days = np.array(dates, dtype="datetime64[D]").astype(float)
+    else:
+        days = np.arange(len(values), dtype=float)
+    if count > 1:
+        x = days[valid]
+        x = x - x.mean()
+        denom = (x * x).sum()
+        if denom > 0:
+            stats["slope_per_year"] = float((x * (clean - clean.mean())).sum() / denom * 365.25)
+
+    period = trend_years * 365
+    if len(values) > 2 * period:
+        with np.errstate(invalid="ignore"):
+            first = np.nanmean(values[:period]) if valid[:period].any() else np.nan
+            last = np.nanmean(values[-period:]) if valid[-period:].any() else np.nan
+        if not (np.isnan(first) or np.isnan(last)):
+            stats["first_period_mean"] = float(first)
+            stats["last_period_mean"] = float(last)
+            stats["period_change"] = float(last - first)
+
+    if dates is not None:
+        stats["normals"] = day_of_year_normals(values, dates)
+    return stats
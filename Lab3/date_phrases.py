@@ -0,0 +1,322 @@
+import datetime
+import functools
+import re
+
+# --- Date phrases ---
+# Compiled fast path for the dates in chat questions: ISO, numeric and
+# month-name dates, today/tomorrow/yesterday, this/next/last week, weekend,
+# month or year, "in N days", "N days ago", weekday names, years ("in 2020")
+# and explicit ranges ("from X to Y", "June 1-5"). Every phrase maps to a real (start, end) range. Only text
+# with date words this module cannot place falls back to dateparser, which is
+# slow to import and slow on long sentences; results are cached per
+# normalized question.
+
+# Returned by fast_range() for date language it cannot place
+UNSURE = object()
+
+CACHE_SIZE = 512
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+_M = r"(?P<month>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+_D = r"(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+_LAST_D = r"(?P<last_day>\d{1,2})(?:st|nd|rd|th)?"
+_Y = r"(?P<year>\d{4})"
+_N = r"(?P<n>\d{1,3}|an?|one|two|three|four|five|six|seven|eight|nine|ten)"
+_UNIT = r"(?P<unit>day|week|month)s?"
+# A year on its own only counts after one of these words ("in 2020", "from 2019 to 2021")
+_YEAR_AFTER = "|".join(rf"(?<=\b{word} )" for word in (
+    "in", "during", "for", "throughout", "from", "between", "to", "and", "until", "till", "through", "thru", "year",
+))
+
+# Text between two dates that makes them one range ("from X to Y", "X - Y")
+_RANGE_JOIN_RE = re.compile(r"\s*(?:to|until|till|through|thru|and|-|–)\s*")
+# Date language worth handing to dateparser when the patterns found nothing.
+# Month names and "next" only count in date context: "may" or "next" alone is an ordinary word.
+_HINT_RE = re.compile(
+    rf"\b(?:early|late|mid|since|before|after|until|till|by|around|end of|start of|beginning of)[\s-]+{_M}(?!\w)|"
+    r"\b(?:next|coming|last|past|this)\s+(?:\w+\s+)?(?:days|weeks|months|years|weekends|summer|winter|spring|fall|autumn|season|holidays?|fortnight)\b|"
+    r"\b(?:19|20)\d{2}\b|\b\d{1,2}/\d{1,2}\b|\b\d{1,2}\.\d{1,2}\.\d{2,4}\b|\bago\b|\bfortnight\b"
+)
+
+
+def _month(text):
+    return MONTHS[text[:3]]
+
+
+def _number(text):
+    return int(text) if text.isdigit() else NUMBER_WORDS[text]
+
+
+def _month_range(year, month):
+    start = datetime.date(year, month, 1)
+    following = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return start, following - datetime.timedelta(days=1)
+
+
+def _shift_months(year, month, months):
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def _nearest(candidates, today, prefer):
+    """Picks the year for a date given without one: the next or last occurrence, UNSURE without a preference."""
+    if prefer is None:
+        return UNSURE
+    upcoming = [c for c in candidates if c[-1] >= today]
+    past = [c for c in candidates if c[0] <= today]
+    if prefer == "future":
+        return upcoming[0] if upcoming else candidates[-1]
+    return past[-1] if past else candidates[0]
+
+
+# --- Single phrases ---
+# Each handler gets the match, today and the year preference and returns
+# (start, end) or UNSURE.
+
+def _numeric(m, today, prefer):
+    day = datetime.date(int(m["year"]), int(m["month"]), int(m["day"]))
+    return day, day
+
+
+def _month_day(m, today, prefer):
+    month, day = _month(m["month"]), int(m["day"])
+    if m["year"]:
+        date = datetime.date(int(m["year"]), month, day)
+        return date, date
+    dates = [datetime.date(year, month, day) for year in (today.year - 1, today.year, today.year + 1)]
+    return _nearest([(d, d) for d in dates], today, prefer)
+
+
+def _month_days(m, today, prefer):
+    month, first, last = _month(m["month"]), int(m["day"]), int(m["last_day"])
+    if last < first:
+        raise ValueError("backwards day range")
+    if m["year"]:
+        year = int(m["year"])
+        return datetime.date(year, month, first), datetime.date(year, month, last)
+    ranges = [(datetime.date(year, month, first), datetime.date(year, month, last))
+              for year in (today.year - 1, today.year, today.year + 1)]
+    return _nearest(ranges, today, prefer)
+
+
+def _month_year(m, today, prefer):
+    return _month_range(int(m["year"]), _month(m["month"]))
+
+
+def _year(m, today, prefer):
+    year = int(m["year"])
+    return datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+
+
+def _named_month(m, today, prefer):
+    month, which = _month(m["month"]), m["which"]
+    if which == "this":
+        return _month_range(today.year, month)
+    ranges = [_month_range(year, month) for year in (today.year - 1, today.year, today.year + 1)]
+    if which == "next":
+        return next(r for r in ranges if r[0] > today)
+    if which == "last":
+        return [r for r in ranges if r[1] < today][-1]
+    return _nearest(ranges, today, prefer)
+
+
+def _relative_day(m, today, prefer):
+    offset = {
+        "day before yesterday": -2, "yesterday": -1, "today": 0, "tonight": 0, "right now": 0,
+        "tomorrow": 1, "day after tomorrow": 2,
+    }[m["word"]]
+    day = today + datetime.timedelta(days=offset)
+    return day, day
+
+
+def _unit_days(m):
+    n = _number(m["n"])
+    return n * {"day": 1, "week": 7, "month": 30}[m["unit"]]
+
+
+def _in_n(m, today, prefer):
+    days = _unit_days(m)
+    if m["which"] == "within":
+        return today, today + datetime.timedelta(days=days)
+    day = today + datetime.timedelta(days=days)
+    return day, day
+
+
+def _n_ago(m, today, prefer):
+    day = today - datetime.timedelta(days=_unit_days(m))
+    return day, day
+
+
+def _next_n(m, today, prefer):
+    return today + datetime.timedelta(days=1), today + datetime.timedelta(days=_unit_days(m))
+
+
+def _last_n(m, today, prefer):
+    return today - datetime.timedelta(days=_unit_days(m)), today
+
+
+def _period(m, today, prefer):
+    which = {"coming": "next", "past": "last", "previous": "last"}.get(m["which"], m["which"])
+    period = m["period"]
+    if period == "week":
+        if which == "last":
+            # Rolling, as the chat has always read "last week"
+            return today - datetime.timedelta(days=7), today
+        monday = today - datetime.timedelta(days=today.weekday()) + datetime.timedelta(days=7 if which == "next" else 0)
+        return monday, monday + datetime.timedelta(days=6)
+    if period == "weekend":
+        # This weekend is the coming one, or the current one on Saturday and Sunday
+        saturday = today + datetime.timedelta(days=(5 - today.weekday()) % 7 if today.weekday() < 6 else -1)
+        saturday += datetime.timedelta(days={"this": 0, "next": 7, "last": -7}[which])
+        return saturday, saturday + datetime.timedelta(days=1)
+    if period == "month":
+        year, month = _shift_months(today.year, today.month, {"this": 0, "next": 1, "last": -1}[which])
+        return _month_range(year, month)
+    year = today.year + {"this": 0, "next": 1, "last": -1}[which]
+    return datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+
+
+def _weekday(m, today, prefer):
+    target = WEEKDAYS.index(m["weekday"])
+    ahead = (target - today.weekday()) % 7
+    upcoming = today + datetime.timedelta(days=ahead)
+    previous = today - datetime.timedelta(days=(today.weekday() - target) % 7)
+    which = m["which"]
+    if which in ("next", "coming"):
+        day = upcoming if ahead else today + datetime.timedelta(days=7)
+    elif which == "last":
+        day = previous if previous < today else today - datetime.timedelta(days=7)
+    elif which == "this":
+        day = upcoming
+    elif prefer is None:
+        return UNSURE
+    else:
+        day = upcoming if prefer == "future" else previous
+    return day, day
+
+
+# Longer and more specific patterns first; overlapping later matches are ignored
+PATTERNS = [(re.compile(pattern), handler) for pattern, handler in [
+    (r"\b(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b", _numeric),
+    (r"\b(?P<month>\d{1,2})/(?P<day>\d{1,2})/(?P<year>\d{4})\b", _numeric),
+    (rf"\b{_M}\s+{_D}\s*[-–]\s*{_LAST_D}(?:,?\s+{_Y})?\b", _month_days),
+    (rf"\b{_D}\s*[-–]\s*{_LAST_D}\s+(?:of\s+)?{_M}(?:,?\s+{_Y})?\b", _month_days),
+    (rf"\b{_M}\s+{_D}(?:,?\s+{_Y})?\b", _month_day),
+    (rf"\b{_D}\s+(?:of\s+)?{_M}(?:,?\s+{_Y})?\b", _month_day),
+    (rf"\b{_M},?\s+{_Y}\b", _month_year),
+    (rf"\b(?P<which>in|during|for|this|next|last)\s+{_M}(?!\w)", _named_month),
+    (rf"(?:{_YEAR_AFTER})(?P<year>(?:19|20)\d{{2}})\b", _year),
+    (r"\b(?P<word>day before yesterday|day after tomorrow|yesterday|today|tonight|right now|tomorrow)\b", _relative_day),
+    (rf"\b(?P<which>in|within)\s+{_N}\s+{_UNIT}\b", _in_n),
+    (rf"\b{_N}\s+{_UNIT}\s+ago\b", _n_ago),
+    (rf"\b(?:next|coming)\s+{_N}\s+{_UNIT}\b", _next_n),
+    (rf"\b(?:last|past|previous)\s+{_N}\s+{_UNIT}\b", _last_n),
+    (r"\b(?P<which>this|next|coming|last|past|previous)\s+(?P<period>weekend|week|month|year)\b", _period),
+    (rf"\b(?:(?P<which>this|next|coming|last|on)\s+)?(?P<weekday>{'|'.join(WEEKDAYS)})s?\b", _weekday),
+]]
+
+
+def normalize(text):
+    """Lowercases and collapses whitespace and sentence punctuation; the cache key for a question."""
+    return " ".join(re.sub(r"[?!;,\"]", " ", text.lower()).split())
+
+
+def _resolve(m, handler, today, prefer):
+    try:
+        return handler(m, today, prefer)
+    except (ValueError, IndexError, StopIteration):
+        # Impossible dates such as February 30th
+        return UNSURE
+
+
+def _matches(text):
+    """Non-overlapping (match, handler) for every phrase found, in text order."""
+    found = []
+    for pattern, handler in PATTERNS:
+        for m in pattern.finditer(text):
+            if not any(m.start() < other.end() and other.start() < m.end() for other, _ in found):
+                found.append((m, handler))
+    return sorted(found, key=lambda item: item[0].start())
+
+
+def date_words(text):
+    """The normalized words of text that belong to date language, e.g. {"next", "week"}."""
+    text = normalize(text)
+    spans = [m for m, _ in _matches(text)] + list(_HINT_RE.finditer(text))
+    return {word for m in spans for word in m.group().split()}
+
+
+def _has_year(m):
+    return bool(m.groupdict().get("year"))
+
+
+def fast_range(text, today=None, prefer="future"):
+    """
+    (start, end) for the first date phrase in text, joining two phrases linked
+    by "to"/"until"/"and" into one range. Returns None when the text has no
+    date language, or UNSURE when it has some these patterns cannot place.
+    prefer ("future", "past" or None) picks the year of dates given without
+    one; with None they are UNSURE.
+    """
+    today = today or datetime.date.today()
+    text = normalize(text)
+    found = _matches(text)
+    if not found:
+        return UNSURE if _HINT_RE.search(text) else None
+    for (first, first_handler), (second, second_handler) in zip(found, found[1:]):
+        if not _RANGE_JOIN_RE.fullmatch(text[first.end():second.start()]):
+            continue
+        if first_handler is _month_day and _has_year(second) and not _has_year(first):
+            # "June 1 to June 5, 2023", "Dec 28 to Jan 3 2024": the start takes the end's
+            # year, or the one before when that would put it after the end
+            end = _resolve(second, second_handler, today, prefer)
+            start = UNSURE if end is UNSURE else _resolve(first, first_handler, end[1], "past")
+        elif second_handler is _month_day and _has_year(first) and not _has_year(second):
+            # "June 1, 2023 to June 5": the end is the next occurrence after the start
+            start = _resolve(first, first_handler, today, prefer)
+            end = UNSURE if start is UNSURE else _resolve(second, second_handler, start[0], "future")
+        else:
+            start = _resolve(first, first_handler, today, prefer)
+            end = _resolve(second, second_handler, today, prefer)
+            if start is not UNSURE and end is not UNSURE and end[1] < start[0] and prefer is not None:
+                # "from Friday to Monday", "Dec 28 to Jan 3": the end is the next occurrence after the start
+                end = _resolve(second, second_handler, start[0], "future")
+        if start is UNSURE or end is UNSURE or end[1] < start[0]:
+            # A backwards range ("2024-01-20 until 2024-01-15") is not joined either
+            break
+        return start[0], end[1]
+    first, handler = found[0]
+    return _resolve(first, handler, today, prefer)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _parse(normalized, today, prefer):
+    dates = fast_range(normalized, today, prefer)
+    if dates is not UNSURE:
+        return dates
+    # dateparser is slow to import; only load it for text the fast path can't place
+    import dateparser
+
+    settings = {"PREFER_DATES_FROM": prefer or "current_period", "RELATIVE_BASE": datetime.datetime.combine(today, datetime.time())}
+    parsed = dateparser.parse(normalized, settings=settings)
+    if parsed is None:
+        return None
+    return parsed.date(), parsed.date()
+
+
+def parse_range(text, today=None, prefer="future"):
+    """
+    (start, end) for the dates in a question, or None if it names none.
+    Tries the compiled patterns first and falls back to dateparser; results
+    are cached per normalized question and day.
+    """
+    return _parse(normalize(text), today or datetime.date.today(), prefer)
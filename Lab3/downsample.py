@@ -0,0 +1,46 @@
+import numpy as np
+
+# --- Chart downsampling ---
+# Long series (decades of daily values, years of hourly ones) are reduced to
+# about as many points as a chart can show before they are sent to the
+# browser. Largest-Triangle-Three-Buckets keeps the visual shape (peaks and
+# troughs survive); stats must still be computed from the full series.
+
+# Roughly two points per horizontal pixel of a full-width chart
+CHART_POINTS = 1500
+
+
+def lttb_indices(y, target):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps from y (evenly spaced x)."""
+    n = len(y)
+    if target >= n or target < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, target - 1).astype(int)
+    keep = np.empty(target, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(target - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(times, values, target=CHART_POINTS):
+    """
+    Returns (times, values) reduced to about target points for plotting.
+    Short series come back unchanged; in longer ones missing values (None/NaN)
+    are dropped before bucketing, so gaps are bridged.
+    """
+    if len(values) <= target:
+        return list(times), list(values)
+    y = np.array([np.nan if v is None else v for v in values], dtype=float)
+    present = np.flatnonzero(~np.isnan(y))
+    keep = present[lttb_indices(y[present], target)]
+    return [times[i] for i in keep], y[keep].tolist()
@@ -0,0 +1,209 @@
+import asyncio
+import functools
+import queue
+import threading
+from datetime import date
+
+import archive_store
+import perf
+import weather_client
+
+# --- Async fetch pipeline ---
+# One background event loop per process runs all upstream work for the weather
+# pages. Blocking client calls are pushed to worker threads under a shared
+# concurrency limit, so independent work (several candidate cities, several
+# archive windows) overlaps instead of running back to back. Streamlit scripts
+# use the synchronous facade at the bottom and never touch asyncio directly.
+#
+# Calls scheduled here must be leaf calls: they must not call back into the
+# pipeline themselves, or they could wait on slots held by their own callers.
+
+MAX_CONCURRENCY = 8
+# Extra attempts for a failed chunk of a chunked download (on top of the
+# retries the upstream already does), so one bad year doesn't sink the range
+CHUNK_RETRIES = 1
+
+_loop = None
+_loop_lock = threading.Lock()
+_semaphore = None
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="fetch-pipeline", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def _limit():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _semaphore
+
+
+def year_chunks(start_date, end_date):
+    """Splits [start_date, end_date] into calendar-year (start, end) date pieces."""
+    start = start_date if isinstance(start_date, date) else date.fromisoformat(str(start_date)[:10])
+    end = end_date if isinstance(end_date, date) else date.fromisoformat(str(end_date)[:10])
+    chunks = []
+    while start <= end:
+        chunk_end = min(date(start.year, 12, 31), end)
+        chunks.append((start, chunk_end))
+        start = date(start.year + 1, 1, 1)
+    return chunks
+
+
+# --- Coroutines ---
+
+async def call(fn, *args, **kwargs):
+    """Runs a blocking call in a worker thread, within the shared concurrency limit."""
+    async with _limit():
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+async def gather_calls(calls, return_exceptions=False):
+    """Runs zero-argument callables concurrently and returns their results in order."""
+    return await asyncio.gather(*(call(c) for c in calls), return_exceptions=return_exceptions)
+
+
+async def _attempts(fn, retries):
+    for attempt in range(retries + 1):
+        try:
+            return await call(fn)
+        except Exception:
+            if attempt == retries:
+                raise
+
+
+async def _report(results, index, fn, retries):
+    try:
+        results.put((index, await _attempts(fn, retries), None))
+    except Exception as e:
+        results.put((index, None, e))
+
+
+async def resolve_cities_async(names):
+    """Resolves several city names concurrently; misses (and lookup errors) come back as None."""
+    results = await gather_calls([functools.partial(weather_client.resolve_city, n) for n in names], return_exceptions=True)
+    return [None if isinstance(r, Exception) else r for r in results]
+
+
+async def city_archive_async(city, start_date, end_date, unit="celsius", match=None, **query):
+    """
+    Geocodes a city, then queries the archive directly (fields=/daily=/hourly= as in weather_client.archive).
+    A match already resolved elsewhere (e.g. by the gazetteer) skips the geocoding call.
+    """
+    if match is None:
+        match = await call(weather_client.resolve_city, city)
+    if match is None:
+        return None, None
+    data = await call(
+        weather_client.archive, match["latitude"], match["longitude"],
+        start_date, end_date, unit=unit, **query,
+    )
+    return match, data
+
+
+# --- Synchronous facade ---
+
+def run(coro):
+    """Runs a coroutine on the pipeline loop and blocks until it finishes (inside the caller's perf trace)."""
+    return asyncio.run_coroutine_threadsafe(perf.bind(coro), _get_loop()).result()
+
+
+def gather(calls, return_exceptions=False):
+    return run(gather_calls(calls, return_exceptions=return_exceptions))
+
+
+def stream(calls, retries=0):
+    """
+    Runs zero-argument callables concurrently and yields (index, result, error)
+    in completion order, so the caller can render each result as it lands.
+    A failing call is retried on its own up to `retries` more times.
+    """
+    results = queue.Queue()
+
+    async def run_all():
+        await asyncio.gather(*(_report(results, i, c, retries) for i, c in enumerate(calls)))
+
+    future = asyncio.run_coroutine_threadsafe(perf.bind(run_all()), _get_loop())
+    for _ in calls:
+        yield results.get()
+    future.result()
+
+
+def resolve_city(name):
+    return run(call(weather_client.resolve_city, name))
+
+
+def resolve_cities(names):
+    return run(resolve_cities_async(names))
+
+
+def archive_chunks(lat, lon, start_date, end_date, unit="celsius", **query):
+    """
+    Downloads a long archive range as parallel year-sized chunks (query as in
+    weather_client.archive). Yields ((chunk_start, chunk_end), data, error) as
+    chunks finish; error is set only once a chunk has used up its retries.
+    """
+    chunks = year_chunks(start_date, end_date)
+    calls = [functools.partial(weather_client.archive, lat, lon, s, e, unit=unit, **query) for s, e in chunks]
+    for index, data, error in stream(calls, retries=CHUNK_RETRIES):
+        yield chunks[index], data, error
+
+
+def archive_chunks_batch(locations, start_date, end_date, unit="celsius", **query):
+    """
+    archive_chunks for several (lat, lon) locations at once: each year chunk is a
+    single multi-location request, so the request count does not grow with the
+    number of locations. Yields ((chunk_start, chunk_end), [data per location], error).
+    """
+    chunks = year_chunks(start_date, end_date)
+    calls = [functools.partial(weather_client.archive_batch, locations, s, e, unit=unit, **query) for s, e in chunks]
+    for index, data, error in stream(calls, retries=CHUNK_RETRIES):
+        yield chunks[index], data, error
+
+
+def city_series(city, start_date, end_date, variables, unit="celsius", timezone=None, on_progress=None):
+    """
+    Geocodes a city, then reads its daily series through the archive store,
+    downloading the ranges it lacks as parallel year-sized chunks.
+    on_progress(done, total) is called in the caller's thread after each chunk.
+    Returns (match, data); data["failed_ranges"] lists chunks that still failed.
+    """
+    match = resolve_city(city)
+    if match is None:
+        return None, None
+    lat, lon = match["latitude"], match["longitude"]
+
+    chunks = [c for gap in archive_store.missing(lat, lon, start_date, end_date, variables, unit, timezone)
+              for c in year_chunks(*gap)]
+    calls = [functools.partial(weather_client.archive, lat, lon, s, e, daily=variables, unit=unit, timezone=timezone)
+             for s, e in chunks]
+    failed, errors, unsaved = [], [], []
+    for done, (index, data, error) in enumerate(stream(calls, retries=CHUNK_RETRIES), 1):
+        if error is None:
+            if not archive_store.store(lat, lon, chunks[index][0], data, variables, unit, timezone):
+                unsaved.append((chunks[index][0], data))
+        else:
+            failed.append(chunks[index])
+            errors.append(error)
+        if on_progress:
+            on_progress(done, len(chunks))
+    if errors and len(errors) == len(chunks):
+        raise errors[0]
+
+    data = archive_store.read(lat, lon, start_date, end_date, variables, unit, timezone)
+    # Chunks the store could not persist (e.g. read-only cache dir) are served from memory
+    for chunk_start, fetched in unsaved:
+        archive_store.overlay(data, chunk_start, fetched, variables)
+    data["failed_ranges"] = [(s.isoformat(), e.isoformat()) for s, e in sorted(failed)]
+    return match, data
+
+
+def city_archive(city, start_date, end_date, unit="celsius", match=None, **query):
+    return run(city_archive_async(city, start_date, end_date, unit=unit, match=match, **query))
@@ -0,0 +1,83 @@
+import numpy as np
+
+import climate_stats
+
+# --- Local statistical forecast ---
+# Fits the archived daily series with a linear trend plus a few yearly
+# harmonics (least squares), so "temperature on date X" is answered in a
+# millisecond without calling Gemini. Prediction intervals come from the
+# residuals seen around the same time of year, which keeps them wide in
+# volatile seasons and narrow in steady ones. Gemini is only used, optionally,
+# to narrate the numbers.
+
+HARMONICS = 3
+# Residuals within this many days of the target's day of year set the interval
+SEASON_WINDOW_DAYS = 15
+YEAR_DAYS = 365.25
+
+
+def _design(days, origin, harmonics):
+    """Columns: intercept, trend (years since origin), then sin/cos pairs of the yearly cycle."""
+    t = (days - origin) / YEAR_DAYS
+    phase = 2 * np.pi * t
+    columns = [np.ones_like(t), t]
+    for k in range(1, harmonics + 1):
+        columns += [np.sin(k * phase), np.cos(k * phase)]
+    return np.column_stack(columns)
+
+
+def fit(values, dates, harmonics=HARMONICS):
+    """
+    Fits trend + seasonal harmonics to a daily series (None/NaN days skipped).
+    Returns the model dict used by predict(), or None with under a year of data.
+    """
+    values = climate_stats.as_array(values)
+    days = np.array(dates, dtype="datetime64[D]").astype(float)
+    valid = ~np.isnan(values)
+    if valid.sum() < 365:
+        return None
+    origin = days[valid][0]
+    X = _design(days[valid], origin, harmonics)
+    coef, *_ = np.linalg.lstsq(X, values[valid], rcond=None)
+    residuals = values[valid] - X @ coef
+    return {
+        "coef": coef,
+        "origin": origin,
+        "harmonics": harmonics,
+        "residuals": residuals,
+        "residual_doy": climate_stats.day_of_year(np.array(dates, dtype="datetime64[D]")[valid]),
+        "trend_per_year": float(coef[1]),
+        "last_day": days[valid][-1],
+    }
+
+
+def predict(model, target_date, level=0.8):
+    """
+    Forecast for one date. Returns a dict with date, mean, low and high (the
+    central `level` prediction interval), level, trend_per_year and normal (the
+    seasonal value without the trend's extrapolation beyond the data).
+    """
+    day = np.datetime64(str(target_date)[:10], "D")
+    x = _design(np.array([day.astype(float)]), model["origin"], model["harmonics"])[0]
+    mean = float(x @ model["coef"])
+
+    # Residual spread around the same time of year (wrapping across New Year)
+    doy = climate_stats.day_of_year([day])[0]
+    distance = np.abs(model["residual_doy"] - doy)
+    nearby = model["residuals"][np.minimum(distance, 366 - distance) <= SEASON_WINDOW_DAYS]
+    if len(nearby) < 30:
+        nearby = model["residuals"]
+    tail = (1 - level) / 2 * 100
+    low, high = np.percentile(nearby, [tail, 100 - tail])
+
+    x_normal = x.copy()
+    x_normal[1] = (min(day.astype(float), model["last_day"]) - model["origin"]) / YEAR_DAYS
+    return {
+        "date": str(day),
+        "mean": mean,
+        "low": mean + float(low),
+        "high": mean + float(high),
+        "level": level,
+        "trend_per_year": model["trend_per_year"],
+        "normal": float(x_normal @ model["coef"]),
+    }
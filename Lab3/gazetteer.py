@@ -0,0 +1,218 @@
+import csv
+import os
+import re
+import unicodedata
+
+# --- Offline city gazetteer ---
+# A token trie over data/cities.csv (GeoNames-style: name, country, coordinates,
+# population, alternate names). find_cities() scans a sentence once and returns
+# every city mention, including multi-word names like "New York" or
+# "San Francisco", without any network calls. A country or US state right
+# after the name ("Athens, Georgia", "Paris France") narrows the match.
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cities.csv")
+
+_TOKEN_RE = re.compile(r"\w+(?:'\w+)?")
+_END = "$"
+
+_trie = None
+_regions = None
+
+# Region qualifiers: country names and US states (with postal codes). Names of
+# three letters or fewer only count in their exact spelling, after a comma.
+COUNTRIES = {
+    "US": "United States|United States of America|USA|US|America",
+    "GB": "United Kingdom|UK|Britain|Great Britain|England|Scotland|Wales",
+    "CN": "China", "IN": "India", "JP": "Japan", "IT": "Italy", "CA": "Canada", "AU": "Australia", "ES": "Spain",
+    "DE": "Germany", "BR": "Brazil", "ZA": "South Africa", "PK": "Pakistan", "MX": "Mexico", "FR": "France",
+    "VN": "Vietnam", "TR": "Turkey", "SA": "Saudi Arabia", "RU": "Russia", "NZ": "New Zealand", "MA": "Morocco",
+    "KR": "South Korea|Korea", "IL": "Israel", "EG": "Egypt", "CH": "Switzerland", "BD": "Bangladesh",
+    "AE": "United Arab Emirates|UAE", "ZW": "Zimbabwe", "VE": "Venezuela", "UY": "Uruguay", "UG": "Uganda",
+    "UA": "Ukraine", "TZ": "Tanzania", "TW": "Taiwan", "TN": "Tunisia", "TH": "Thailand", "SN": "Senegal",
+    "SG": "Singapore", "SE": "Sweden", "SD": "Sudan", "QA": "Qatar", "PT": "Portugal", "PL": "Poland",
+    "PH": "Philippines", "PE": "Peru", "NP": "Nepal", "NO": "Norway", "NL": "Netherlands|Holland", "NG": "Nigeria",
+    "MY": "Malaysia", "MM": "Myanmar", "LK": "Sri Lanka", "LB": "Lebanon", "KH": "Cambodia", "KE": "Kenya",
+    "JO": "Jordan", "IS": "Iceland", "IR": "Iran", "IQ": "Iraq", "IE": "Ireland", "ID": "Indonesia", "HU": "Hungary",
+    "HK": "Hong Kong", "GR": "Greece", "GH": "Ghana", "FI": "Finland", "ET": "Ethiopia", "EC": "Ecuador",
+    "DZ": "Algeria", "DK": "Denmark", "CZ": "Czech Republic|Czechia", "CU": "Cuba", "CO": "Colombia", "CL": "Chile",
+    "CI": "Ivory Coast", "CD": "Congo", "BE": "Belgium", "AT": "Austria", "AR": "Argentina", "AO": "Angola",
+    "AF": "Afghanistan", "GE": "Georgia",
+}
+US_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California", "CO": "Colorado",
+    "CT": "Connecticut", "DE": "Delaware", "DC": "District of Columbia", "FL": "Florida", "GA": "Georgia",
+    "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois", "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky",
+    "LA": "Louisiana", "ME": "Maine", "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota",
+    "MS": "Mississippi", "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada", "NH": "New Hampshire",
+    "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York", "NC": "North Carolina", "ND": "North Dakota",
+    "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon", "PA": "Pennsylvania", "RI": "Rhode Island",
+    "SC": "South Carolina", "SD": "South Dakota", "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont",
+    "VA": "Virginia", "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+}
+
+
+def _fold(text):
+    """Lower-cases and strips accents so "São Paulo" and "sao paulo" compare equal."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    """Returns (folded token, original token, start, end) for each word in text."""
+    return [(_fold(m.group()), m.group(), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+
+def _load():
+    trie = {}
+    with open(DATA_PATH, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            entry = {
+                "name": row["name"],
+                "country": row["country"],
+                "latitude": float(row["latitude"]),
+                "longitude": float(row["longitude"]),
+                "population": int(row["population"]),
+            }
+            names = [row["name"]] + [n for n in row["alternate_names"].split("|") if n]
+            for name in names:
+                node = trie
+                for folded, _, _, _ in tokenize(name):
+                    node = node.setdefault(folded, {})
+                # Short aliases like "LA" or "SF" must match their exact spelling
+                exact = name if len(name.replace(".", "")) <= 3 else None
+                node.setdefault(_END, []).append((exact, entry))
+    for node in _walk(trie):
+        if _END in node:
+            node[_END].sort(key=lambda item: -item[1]["population"])
+    return trie
+
+
+def _walk(node):
+    yield node
+    for key, child in node.items():
+        if key != _END:
+            yield from _walk(child)
+
+
+def _get_trie():
+    global _trie
+    if _trie is None:
+        _trie = _load()
+    return _trie
+
+
+def _best(candidates, original):
+    for exact, entry in candidates:
+        if exact is None or exact == original:
+            return entry
+    return None
+
+
+# --- Region qualifiers ---
+
+def _get_regions():
+    """Folded region name -> [(exact spelling or None, (country code, US state or None))]."""
+    global _regions
+    if _regions is None:
+        regions = {}
+
+        def add(name, place):
+            exact = name if len(name) <= 3 else None
+            regions.setdefault(" ".join(t[0] for t in tokenize(name)), []).append((exact, place))
+        for code, names in COUNTRIES.items():
+            for name in names.split("|"):
+                add(name, (code, None))
+        for code, state in US_STATES.items():
+            add(state, ("US", state))
+            add(code, ("US", state))
+        _regions = regions
+    return _regions
+
+
+def region_places(region):
+    """The (country code, US state or None) places a region name can denote; "Georgia" is both."""
+    original = region.strip()
+    key = " ".join(t[0] for t in tokenize(original))
+    return [place for exact, place in _get_regions().get(key, []) if exact is None or exact == original]
+
+
+def region_after(text, end):
+    """
+    The region qualifier right after position end in text, as (region as
+    written, places, end of the qualifier), or None if there is none.
+    """
+    rest = text[end:]
+    tokens = tokenize(rest)[:4]
+    if not tokens:
+        return None
+    lead = rest[:tokens[0][2]]
+    if not re.fullmatch(r"\s*,?\s*", lead):
+        return None
+    for n in range(len(tokens), 0, -1):
+        written = rest[tokens[0][2]:tokens[n - 1][3]]
+        if written != " ".join(t[1] for t in tokens[:n]):
+            continue
+        places = [place for exact, place in _get_regions().get(" ".join(t[0] for t in tokens[:n]), [])
+                  if exact is None or (exact == written and "," in lead)]
+        if places:
+            return written, places, end + tokens[n - 1][3]
+    return None
+
+
+def find_cities(text):
+    """
+    Returns every city mentioned in text, in order, as dicts with name, country,
+    latitude, longitude, population, region and the matched span (start, end).
+    The longest name wins at each position, and the most populated city wins
+    between cities sharing a name. A region written after the name (kept in
+    "region" and inside the span) must match the city's country; when it rules
+    out every entry, as in "Athens, Georgia" (states are not in the data), the
+    mention comes back named "City, Region" without coordinates, for the
+    geocoder to place.
+    """
+    trie = _get_trie()
+    tokens = tokenize(text)
+    found = []
+    i = 0
+    while i < len(tokens):
+        node = trie
+        match = None
+        j = i
+        while j < len(tokens) and tokens[j][0] in node:
+            node = node[tokens[j][0]]
+            j += 1
+            if _END in node:
+                original = text[tokens[i][2]:tokens[j - 1][3]]
+                entry = _best(node[_END], original)
+                if entry is not None:
+                    match = (j, entry, node[_END])
+        if match is None:
+            i += 1
+            continue
+        j, entry, candidates = match
+        end = tokens[j - 1][3]
+        region = region_after(text, end)
+        if region is None:
+            found.append(dict(entry, region=None, start=tokens[i][2], end=end))
+            i = j
+            continue
+        written, places, end = region
+        original = text[tokens[i][2]:tokens[j - 1][3]]
+        entry = _best([(exact, e) for exact, e in candidates if (e["country"], None) in places], original)
+        if entry is None:
+            entry = {"name": f"{original}, {written}", "country": None,
+                     "latitude": None, "longitude": None, "population": 0}
+        found.append(dict(entry, region=written, start=tokens[i][2], end=end))
+        while j < len(tokens) and tokens[j][2] < end:
+            j += 1
+        i = j
+    return found
+
+
+def lookup(name):
+    """Returns the gazetteer entry whose name is exactly name (any case), or None."""
+    name = name.strip()
+    for match in find_cities(name):
+        if match["start"] == 0 and match["end"] == len(name) and match["latitude"] is not None:
+            return match
+    return None
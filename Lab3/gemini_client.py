@@ -0,0 +1,142 @@
+import json
+import os
+
+import requests
+
+import perf
+import retry
+import weather_client
+
+# --- Gemini helpers ---
+# REST and SDK helpers shared by the chatbot pages (google.generativeai SDK),
+# phase3 and the Long-Range predictor (REST API). Every call goes through the
+# "gemini" upstream in retry.py, and streaming helpers let answers be written
+# to the UI as tokens arrive.
+
+# Base URL can be overridden (e.g. to point at standin_server.py)
+API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+API_ROOT = f"{API_BASE}/v1beta/models"
+TIMEOUT = (5, 120)
+
+
+class GeminiAPIError(Exception):
+    """Raised when a Gemini REST call fails."""
+
+
+def stream_text(response):
+    """
+    Yields the text of each chunk of a generate_content(..., stream=True)
+    response. The SDK only reports a failed request once the stream is read,
+    so errors met while iterating are raised as GeminiAPIError.
+    """
+    from google.api_core import exceptions as api_exceptions
+    try:
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a trailing finish/safety chunk)
+                continue
+            if text:
+                yield text
+    except (api_exceptions.GoogleAPIError, requests.exceptions.RequestException) as e:
+        raise GeminiAPIError(str(e)) from e
+
+
+def sdk_clients(api_key):
+    """
+    SDK client factory for api_key alone; get_default_client("generative") or
+    ("model") returns its clients. genai.configure() is process-wide, so
+    sessions with different keys must not share it. Honours GEMINI_API_BASE,
+    switching to REST transport when it is set. The SDK takes most of a
+    second to import, so pages only pay for it once they talk to a model.
+    """
+    from google.generativeai import client
+
+    options = {"api_key": api_key}
+    if "GEMINI_API_BASE" in os.environ:
+        options.update(transport="rest", client_options={"api_endpoint": API_BASE})
+    clients = client._ClientManager()
+    clients.configure(**options)
+    return clients
+
+
+def model_url(model, method="generateContent"):
+    """REST endpoint for a model method, e.g. generateContent or streamGenerateContent."""
+    return f"{API_ROOT}/{model}:{method}"
+
+
+def generate(url, payload, api_key, on_retry=None):
+    """Non-streaming generateContent REST call with retries; returns the parsed JSON response."""
+    with perf.span("gemini") as span:
+        try:
+            response = retry.upstream("gemini").request(
+                weather_client.get_session(), "POST", url,
+                params={"key": api_key}, json=payload, timeout=TIMEOUT, on_retry=on_retry,
+            )
+        except (retry.RetryError, retry.CircuitOpenError, retry.RateLimitedError) as e:
+            raise GeminiAPIError(str(e)) from e
+        span.add_bytes(len(response.content))
+    if not response.ok:
+        raise GeminiAPIError(f"Gemini returned status {response.status_code}: {response.text[:200]}")
+    return response.json()
+
+
+def call_sdk(fn, *args, on_retry=None, **kwargs):
+    """
+    Runs a google.generativeai call (e.g. model.generate_content) through the
+    Gemini rate limiter and retries. Failures, including SDK errors that are
+    not retried, are raised as GeminiAPIError.
+    """
+    from google.api_core import exceptions as api_exceptions
+    try:
+        with perf.span("gemini"):
+            return retry.upstream("gemini").call(fn, *args, on_retry=on_retry, **kwargs)
+    except (retry.RetryError, retry.CircuitOpenError, retry.RateLimitedError, api_exceptions.GoogleAPIError) as e:
+        raise GeminiAPIError(str(e)) from e
+
+
+class RestStream:
+    """
+    Iterates the text of a streamGenerateContent (server-sent events) call.
+    After iteration, .text holds the full answer, .candidate the last
+    candidate seen (with its groundingMetadata, if any) and .bytes the size
+    of the streamed body.
+    """
+
+    def __init__(self, url, payload, api_key, on_retry=None):
+        self.url = url
+        self.payload = payload
+        self.api_key = api_key
+        self.on_retry = on_retry
+        self.text = ""
+        self.candidate = {}
+        self.bytes = 0
+
+    def __iter__(self):
+        # Only the request itself is retried; once tokens flow the stream is consumed as is
+        try:
+            with perf.span("gemini first byte"):
+                response = retry.upstream("gemini").request(
+                    weather_client.get_session(), "POST", self.url,
+                    params={"alt": "sse", "key": self.api_key}, json=self.payload,
+                    stream=True, timeout=TIMEOUT, on_retry=self.on_retry,
+                )
+        except (retry.RetryError, retry.CircuitOpenError, retry.RateLimitedError) as e:
+            raise GeminiAPIError(str(e)) from e
+        if not response.ok:
+            raise GeminiAPIError(f"Gemini returned status {response.status_code}: {response.text[:200]}")
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                self.bytes += len(line) + 2
+                if not line or not line.startswith("data:"):
+                    continue
+                chunk = json.loads(line[len("data:"):])
+                candidate = (chunk.get("candidates") or [{}])[0]
+                if candidate.get("groundingMetadata"):
+                    self.candidate["groundingMetadata"] = candidate["groundingMetadata"]
+                for part in candidate.get("content", {}).get("parts", []):
+                    text = part.get("text")
+                    if text:
+                        self.text += text
+                        yield text
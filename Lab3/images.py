@@ -0,0 +1,205 @@
+"""
+Local image pipeline for the portfolio pages.
+
+Image references in info*.py are resolved to a local file: the relative
+path itself, the checked-out file for raw URLs of this repository, or for
+any other URL a copy downloaded once into CACHE_DIR/images under a hash of
+the URL. They are served as thumbnails
+sized for where they are shown, instead of making the browser fetch and
+downscale full-size originals from third-party hosts. Thumbnails are built
+on first use and kept on disk under CACHE_DIR and in memory; references
+that cannot be resolved (non-raster files such as SVG, missing files,
+failed downloads) are passed through unchanged.
+
+<img> tags we write ourselves get WebP data URIs. st.image re-encodes
+anything but JPEG, PNG or GIF (and shrinks anything wider than it is shown)
+on every rerun, so thumbnails for it are JPEG (PNG with transparency) at
+exactly the display width and pass through untouched.
+
+    python images.py        # download and build every thumbnail ahead of time; list what could not be resolved
+"""
+import base64
+import functools
+import hashlib
+import io
+import os
+from urllib.parse import quote, unquote, urlsplit
+
+from cache import CACHE_DIR
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Raw URLs of files in this repository (at any commit) map to the checked-out copy
+REPO_RAW_URL = "https://raw.githubusercontent.com/lhernstberger/CS1301Lab3/"
+# When set (e.g. to standin_server.py), remote images are fetched from <base>/v1/image?url=<original>
+IMAGES_URL = os.environ.get("LAB3_IMAGES_URL")
+DOWNLOAD_DIR = os.path.join(CACHE_DIR, "images")
+THUMB_DIR = os.path.join(CACHE_DIR, "thumbs")
+# Larger downloads are not kept; the reference passes through instead
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+# WebP thumbnails are rendered at this multiple of their display width for high-DPI screens
+PIXEL_RATIO = 2
+# Images shown at the container width are capped at this many pixels
+MAX_WIDTH = 1200
+QUALITY = 80
+# Raster formats Pillow re-encodes; other references (e.g. SVG logos) pass through
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+
+def _is_url(ref):
+    return urlsplit(ref).scheme in ("http", "https")
+
+
+@functools.lru_cache(maxsize=128)
+def _download(url):
+    """Path of the cached copy of url, downloading it on first use; None if that fails (remembered per process)."""
+    extension = os.path.splitext(unquote(urlsplit(url).path))[1].lower()
+    if extension not in IMAGE_EXTENSIONS:
+        return None
+    if IMAGES_URL:
+        url = f"{IMAGES_URL}/v1/image?url={quote(url, safe='')}"
+    path = os.path.join(DOWNLOAD_DIR, hashlib.sha256(url.encode()).hexdigest()[:16] + extension)
+    if os.path.isfile(path):
+        return path
+    # Only pages with remote images that are not cached yet pay for the HTTP client
+    import requests
+    import weather_client
+
+    try:
+        response = weather_client.get_session().get(url, timeout=weather_client.TIMEOUT)
+    except requests.exceptions.RequestException:
+        return None
+    if not response.ok or not response.headers.get("Content-Type", "").startswith("image/") \
+            or len(response.content) > MAX_DOWNLOAD_BYTES:
+        return None
+    try:
+        os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp, path)
+    except OSError:
+        return None
+    return path
+
+
+def resolve(ref):
+    """Local path for an image reference (downloading URLs on first use), or None if there is none."""
+    if not ref:
+        return None
+    if ref.startswith(REPO_RAW_URL):
+        # <commit>/Lab3/<path>
+        _, _, relative = unquote(urlsplit(ref).path)[len(urlsplit(REPO_RAW_URL).path):].partition("/Lab3/")
+        path = os.path.join(HERE, relative)
+        if relative and path.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path):
+            return path
+    if _is_url(ref):
+        return _download(ref)
+    path = ref if os.path.isabs(ref) else os.path.join(HERE, ref)
+    if not path.lower().endswith(IMAGE_EXTENSIONS):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def _thumb_path(path, width, fmt):
+    stat = os.stat(path)
+    key = hashlib.sha256(f"{path}|{stat.st_mtime_ns}|{stat.st_size}|{width}|{fmt}".encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(THUMB_DIR, f"{name}-{width or 'full'}-{key}.{fmt.lower()}")
+
+
+@functools.lru_cache(maxsize=128)
+def _thumbnail(path, width, fmt, thumb_path):
+    if os.path.exists(thumb_path):
+        with open(thumb_path, "rb") as f:
+            return f.read()
+    from PIL import Image
+
+    with Image.open(path) as im:
+        alpha = im.mode in ("RGBA", "LA", "P")
+        im = im.convert("RGBA" if alpha else "RGB")
+        target = min(im.width, width or MAX_WIDTH)
+        if target < im.width:
+            im = im.resize((target, round(im.height * target / im.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if fmt == "WEBP":
+            im.save(buffer, "WEBP", quality=QUALITY, method=6)
+        elif alpha:
+            im.save(buffer, "PNG", optimize=True)
+        else:
+            im.save(buffer, "JPEG", quality=QUALITY, optimize=True, progressive=True)
+    data = buffer.getvalue()
+    try:
+        os.makedirs(THUMB_DIR, exist_ok=True)
+        tmp = f"{thumb_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, thumb_path)
+    except OSError:
+        pass
+    return data
+
+
+def thumbnail(ref, width=None, fmt="WEBP"):
+    """
+    Bytes of the local copy of ref scaled down to width pixels (never up),
+    as WebP or, with fmt="JPEG", JPEG/PNG; None if there is no local copy.
+    """
+    path = resolve(ref)
+    if path is None:
+        return None
+    return _thumbnail(path, width, fmt, _thumb_path(path, width, fmt))
+
+
+def source(ref, width=None):
+    """What to hand to st.image(..., width=width): thumbnail bytes when a local copy exists, otherwise ref itself."""
+    return thumbnail(ref, width, fmt="JPEG") or ref
+
+
+def html_src(ref, width=None):
+    """An <img src> value: an inline WebP data URI when a local copy exists, otherwise ref itself."""
+    data = thumbnail(ref, width * PIXEL_RATIO if width else None)
+    if data is None:
+        return ref
+    return "data:image/webp;base64," + base64.b64encode(data).decode("ascii")
+
+
+# --- Build step ---
+
+def references():
+    """Every image reference in the info*.py modules, found by file extension."""
+    import importlib
+
+    refs = []
+
+    def collect(value):
+        if isinstance(value, str):
+            if value.lower().split("?")[0].endswith(IMAGE_EXTENSIONS + (".svg",)):
+                refs.append(value)
+        elif isinstance(value, dict):
+            for item in value.values():
+                collect(item)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                collect(item)
+
+    for module_name in ("info", "info3"):
+        module = importlib.import_module(module_name)
+        for name, value in vars(module).items():
+            if not name.startswith("_"):
+                collect(value)
+    return list(dict.fromkeys(refs))
+
+
+def main():
+    for ref in references():
+        path = resolve(ref)
+        if path is None:
+            print(f"{'not fetched' if _is_url(ref) else 'missing':<13} {ref}")
+            continue
+        original = os.path.getsize(path)
+        sizes = ", ".join(f"{width or 'full'}: {len(source(ref, width)) // 1024} KB" for width in (250, None))
+        print(f"{'downloaded' if path.startswith(DOWNLOAD_DIR) else 'local':<13} {ref} ({original // 1024} KB) -> {sizes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Cold-start import cost per page.
+
+Runs the top-level imports of every page in a fresh interpreter under
+`python -X importtime` and turns the trace into a table: total import time,
+the part beyond streamlit itself (which every page pays once per server) and
+the heaviest modules the page pulls in. Imports inside functions are not
+counted; that is where slow, rarely needed dependencies belong.
+
+    python import_report.py                 # every page
+    python import_report.py phase4.py --top 8 --repeat 5
+"""
+import argparse
+import ast
+import glob
+import os
+import re
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# import time:  self [us] | cumulative | imported package
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def pages():
+    return ["Home_Page.py", *sorted(os.path.relpath(p, HERE) for p in glob.glob(os.path.join(HERE, "pages", "*.py"))),
+            "phase3.py", "phase4.py"]
+
+
+def top_level_imports(path):
+    """Source of the module-level import statements of a script."""
+    with open(os.path.join(HERE, path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def trace(statements):
+    """Runs statements after `import streamlit` under -X importtime; returns [(depth, name, cumulative_us)]."""
+    code = "\n".join(["import sys", f"sys.path.insert(0, {HERE!r})", "import streamlit", *statements])
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=HERE, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            entries.append((len(indent) // 2, name, int(cumulative)))
+    return entries
+
+
+def measure(path, top):
+    """(total_ms, beyond_streamlit_ms, [(module, ms)]) for one run of a page's imports."""
+    roots = [(name, us) for depth, name, us in trace(top_level_imports(path)) if depth == 0]
+    # A module is reported when its import finishes: everything before streamlit is interpreter startup
+    position = max(i for i, (name, _) in enumerate(roots) if name == "streamlit")
+    streamlit_us = roots[position][1]
+    own = [(name, us) for name, us in roots[position + 1:] if not name.startswith("streamlit")]
+    own_us = sum(us for _, us in own)
+    heaviest = sorted(own, key=lambda item: -item[1])[:top]
+    return (streamlit_us + own_us) / 1000, own_us / 1000, [(name, us / 1000) for name, us in heaviest]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time report per page (python -X importtime).")
+    parser.add_argument("pages", nargs="*", help="default: every page")
+    parser.add_argument("--top", type=int, default=5, help="heaviest modules listed per page")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per page; the median run is reported")
+    args = parser.parse_args()
+
+    print(f"{'page':<40} {'total ms':>9} {'own ms':>8}   heaviest imports beyond streamlit")
+    for path in args.pages or pages():
+        try:
+            runs = [measure(path, args.top) for _ in range(args.repeat)]
+        except (OSError, SyntaxError, RuntimeError) as e:
+            print(f"{path:<40} failed: {e}")
+            continue
+        # The run with the median own time, so the columns stay consistent
+        total, own, modules = sorted(runs, key=lambda run: run[1])[len(runs) // 2]
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in modules) or "-"
+        print(f"{path:<40} {total:>9.0f} {own:>8.0f}   {heaviest}")
+
+
+if __name__ == "__main__":
+    main()
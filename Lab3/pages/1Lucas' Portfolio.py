@@ -1,10 +1,12 @@
 import streamlit as st
 import info3
+import images
 import pandas as pd
 #about me
 def about_me_section():
     st.header("About Me")
-    st.image("https://raw.githubusercontent.com/lhernstberger/CS1301Lab3/4e61f9ed16997f9fc7ff4a6626097c26628bc025/Lab3/Images/unknown.jpeg")
+    # Local copy, served as a cached thumbnail (images.py)
+    st.image(images.source(info3.profile_picture))
     #st.image("https://raw.githubusercontent.com/lhernstberger/CS1301Lab3/ab17a4fece27f64d37ce50f9a65d65c2b7162b2c/Lab3/Images/unknown.jpeg")
     #st.image("https://github.com/lhernstberger/CS1301Lab3/blob/ab17a4fece27f64d37ce50f9a65d65c2b7162b2c/Lab3/Images/unknown.jpeg", width=200)
     #info3.profile_picture, width = 200)
@@ -17,13 +19,13 @@ about_me_section()
 def links_section():
     st.sidebar.header("Links")
     st.sidebar.text("See my cinema taste on Letterboxd")
-    letterboxd_link=f'<a href="{info3.my_letterboxd_url}"><img src="{info3.letterboxd_image_url}" alt="letterboxd" width ="75" height ="75"></a>'
+    letterboxd_link=f'<a href="{info3.my_letterboxd_url}"><img src="{images.html_src(info3.letterboxd_image_url, 75)}" alt="letterboxd" width ="75" height ="75"></a>'
     st.sidebar.markdown(letterboxd_link, unsafe_allow_html=True)
     st.sidebar.text("Checkout my work")
-    github_link = f'<a href="{info3.my_github_url}"><img src="{info3.github_image_url}" alt ="Github" width="65" height="65"></a>'
+    github_link = f'<a href="{info3.my_github_url}"><img src="{images.html_src(info3.github_image_url, 65)}" alt ="Github" width="65" height="65"></a>'
     st.sidebar.markdown(github_link, unsafe_allow_html=True)
     st.sidebar.text("Or email me!")
-    email_html = f'<a href = "mailto:{info3.my_email_address}"><img src="{info3.email_image_url}" alt ="Email" width ="75" height ="75"></a>'
+    email_html = f'<a href = "mailto:{info3.my_email_address}"><img src="{images.html_src(info3.email_image_url, 75)}" alt ="Email" width ="75" height ="75"></a>'
     st.sidebar.markdown(email_html, unsafe_allow_html=True)
 links_section()
 
@@ -58,7 +60,7 @@ def experience_section(experience_data):
     st.header("Professional Experience")
     for job_title, (job_description, image) in experience_data.items():
         expander=st.expander(f"{job_title}")
-        expander.image(image, width=250)
+        expander.image(images.source(image, 250), width=250)
         for bullet in job_description:
             expander.write(bullet)
     st.write("---")
@@ -97,7 +99,7 @@ def activities_section(leadership_data, activity_data):
         st.subheader("Leadership")
         for title, (details, image) in leadership_data.items():
             expander=st.expander(f"{title}")
-            expander.image(image, width=250)
+            expander.image(images.source(image, 250), width=250)
             for bullet in details:
                 expander.write(bullet)
     with tab2:
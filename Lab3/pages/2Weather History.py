@@ -1,12 +1,129 @@
 import streamlit as st
 import datetime
-import requests
-import pandas as pd
+import time
+import fetch_pipeline
+import climate_stats
+import downsample
+import perf
+
+perf.begin("weather_history")
+
+# Archive fields this page renders; hourly data is only requested for the hourly chart
+FIELDS=("daily.temperature_2m_mean",)
+HOURLY_FIELDS=("hourly.temperature_2m",)
+
+# Seconds between redraws while chunks are still arriving
+DRAW_INTERVAL=0.3
+# Most cities compare mode puts on one chart
+MAX_CITIES=10
+
+def combine(chunks,block,variable):
+    """Joins the chunks received so far (keyed by start date) into one series."""
+    times,values=[],[]
+    for key in sorted(chunks):
+        part=chunks[key].get(block,{})
+        times+=part.get("time",[])
+        values+=part.get(variable,[])
+    return times,values
+
+def draw_comparison(chart_area,table_area,series,symbol,full_detail):
+    """Overlays every city's series on one chart and puts their stats side by side."""
+    import pandas as pd  # only once there is something to chart
+    frames=[]
+    rows=[]
+    for name,(times,values) in series.items():
+        stats=climate_stats.summarize(values,times)
+        if stats["count"]==0:
+            continue
+        if not full_detail:
+            times,values=downsample.downsample(times,values,max(300,downsample.CHART_POINTS//len(series)))
+        frames.append(pd.DataFrame({"Date":pd.to_datetime(times),"Temperature":values,"City":name}))
+        rows.append({
+            "City":name,
+            f"Average ({symbol})":round(stats["mean"],1),
+            f"Lowest ({symbol})":stats["min"],
+            f"Highest ({symbol})":stats["max"],
+            f"Middle 80% ({symbol})":f"{stats['percentiles'][10]:.1f} to {stats['percentiles'][90]:.1f}",
+            f"Trend ({symbol}/year)":None if stats["slope_per_year"] is None else round(stats["slope_per_year"],2),
+        })
+    if frames:
+        chart_area.line_chart(pd.concat(frames),x="Date",y="Temperature",color="City")
+        table_area.dataframe(pd.DataFrame(rows).set_index("City"))
+    return len(rows)
+
+def compare_cities(names,start,end,unitsurl,symbol,full_detail):
+    """Compare mode: geocodes all cities at once, then downloads each year for every city in one request."""
+    with perf.span("geocode"):
+        matches=fetch_pipeline.resolve_cities(names)
+    found={name:match for name,match in zip(names,matches) if match}
+    missing=[name for name,match in zip(names,matches) if match is None]
+    if missing:
+        st.warning(f"Couldn't find {', '.join(missing)}; comparing the others.")
+    if not found:
+        st.error("None of those cities were found. Check spelling or try different cities.")
+        st.stop()
+    st.write("---")
+    st.write("Here is where you picked!")
+    st.map({"lat":[m["latitude"] for m in found.values()],"lon":[m["longitude"] for m in found.values()]})
+    st.write("---")
+    st.write("Here is the temperature for each day")
+    progress=st.progress(0.0,text="Downloading...")
+    chart_area=st.empty()
+    table_area=st.empty()
+
+    chunks={}
+    failed=[]
+    total=len(fetch_pipeline.year_chunks(start,end))
+    locations=[(m["latitude"],m["longitude"]) for m in found.values()]
+    last_draw=0.0
+    shown=0
+    with perf.span("fetch"):
+        for done,(chunk,data,error) in enumerate(fetch_pipeline.archive_chunks_batch(locations,start,end,unit=unitsurl,fields=FIELDS),1):
+            if error is None:
+                chunks[chunk[0]]=data
+            else:
+                failed.append(chunk)
+            progress.progress(done/total,text=f"Downloaded {done} of {total} years")
+            if chunks and (done==total or time.perf_counter()-last_draw>DRAW_INTERVAL):
+                with perf.span("draw"):
+                    series={name:combine({k:v[i] for k,v in chunks.items()},"daily","temperature_2m_mean") for i,name in enumerate(found)}
+                    shown=draw_comparison(chart_area,table_area,series,symbol,full_detail)
+                last_draw=time.perf_counter()
+    progress.empty()
+    if failed:
+        years=", ".join(str(chunk_start.year) for chunk_start,_ in sorted(failed))
+        st.warning(f"Couldn't download {years}; those days are left out.")
+    if shown==0:
+        st.error("No temperature data in this time frame. Try again.")
+
+def draw_chart(area,times,values,label,full_detail):
+    import pandas as pd  # only once there is something to chart
+    # Long ranges are thinned out for the chart only; the stats use every point
+    if not full_detail:
+        times,values=downsample.downsample(times,values)
+    area.line_chart(pd.DataFrame({label:values},index=pd.to_datetime(times)))
+
+def draw_stats(area,dates,y,symbol):
+    stats=climate_stats.summarize(y,dates)
+    if stats["count"]==0:
+        return stats
+    with area.container():
+        st.write(f"**Average:** {round(stats['mean'], 1)} {symbol}")
+        st.write(f"**Highest:** {stats['max']} {symbol}")
+        st.write(f"**Lowest:** {stats['min']} {symbol}")
+        st.write(f"**Middle 80% of days:** {round(stats['percentiles'][10], 1)} to {round(stats['percentiles'][90], 1)} {symbol}")
+        if stats["slope_per_year"] is not None and len(dates)>365:
+            st.write(f"**Trend:** {stats['slope_per_year']:+.2f} {symbol} per year")
+    return stats
 
 st.header("Weather History Selector")
 st.write("")
 st.write("---")
-city=st.text_input("What city do you want to look at?","Atlanta")
+compare=st.checkbox("Compare several cities")
+if compare:
+    city=st.text_input("Which cities do you want to compare? (separate them with commas)","Atlanta, Chicago, Denver, Seattle, Miami")
+else:
+    city=st.text_input("What city do you want to look at?","Atlanta")
 st.write("---")
 start = st.date_input("When would you like to start?", min_value=datetime.date(1995, 1, 1), max_value=datetime.date(2024, 10, 31))
 st.write("You chose:",start)
@@ -16,45 +133,70 @@ st.write("You chose:",end)
 st.write("---")
 units=st.radio("What units do you want for temperature?",["Fahrenheit","Celcius"])
 unitsurl=units.lower()
+hourly=st.checkbox("Also show hourly temperatures (much larger download)",disabled=compare) and not compare
+full_detail=st.checkbox("Plot every point (full detail for zooming, slower on long ranges)")
 if st.button("Let's See"):
     if end < start:
         st.error("End date should be after start date. Try again")
         st.stop()
+    symbol="°F" if unitsurl=="fahrenheit" else "°C"
+    if compare:
+        names=list(dict.fromkeys(name.strip() for name in city.split(",") if name.strip()))
+        if len(names)>MAX_CITIES:
+            st.warning(f"Compare mode shows at most {MAX_CITIES} cities. Left out: {', '.join(names[MAX_CITIES:])}")
+            names=names[:MAX_CITIES]
+        try:
+            compare_cities(names,start,end,unitsurl,symbol,full_detail)
+        except Exception as excep:
+            st.error(f"Something else went wrong: {excep}")
+        st.stop()
     try:
-        url=f"https://geocoding-api.open-meteo.com/v1/search?name={city}"
-        endpoint=requests.get(url)
-        data=endpoint.json()
-        pophigh=0
-        lat=0
-        long=0
-        if "results" not in data or len(data["results"])==0:
+        with perf.span("geocode"):
+            match=fetch_pipeline.resolve_city(city)
+        if match is None:
             st.error("City not found. Check spelling or try with a different city.")
             st.stop()
-        for c in data["results"]:
-            if "population" in c:
-                if c["population"]>pophigh:
-                    pophigh=c["population"]
-                    lat=c["latitude"]
-                    long=c["longitude"]
-        if unitsurl=="fahrenheit":
-            url2=f"https://archive-api.open-meteo.com/v1/archive?latitude={lat}&longitude={long}&start_date={start}&end_date={end}&daily=temperature_2m_max,temperature_2m_min,temperature_2m_mean&hourly=temperature_2m&temperature_unit={unitsurl}"
-        else:
-            url2=f"https://archive-api.open-meteo.com/v1/archive?latitude={lat}&longitude={long}&start_date={start}&end_date={end}&daily=temperature_2m_max,temperature_2m_min,temperature_2m_mean&hourly=temperature_2m"
-        endpoint2=requests.get(url2)
-        data2=endpoint2.json()
-        if "daily" not in data2 or "temperature_2m_mean" not in data2["daily"]:
-            st.error("No temperature data in this time frame. Try again.")
-            st.stop()
-        dates=data2["daily"]["time"]
-        y=data2["daily"]["temperature_2m_mean"]
+        lat=match["latitude"]
+        long=match["longitude"]
         st.write("---")
         st.write("Here is where you picked!")
-        st.map(pd.DataFrame({"lat": [lat], "lon": [long]}))
+        st.map({"lat": [lat], "lon": [long]})
         st.write("---")
         st.write("Here is the temperature for each day")
-        st.line_chart(pd.DataFrame({f'Temperature in {units}':y},index=pd.to_datetime(dates)))
-        st.write(f"**Average:** {round(sum(y)/len(y), 1)} °F")
-        st.write(f"**Highest:** {max(y)} °F")
-        st.write(f"**Lowest:** {min(y)} °F")
+        progress=st.progress(0.0,text="Downloading...")
+        daily_chart=st.empty()
+        hourly_chart=st.empty()
+        stats_area=st.empty()
+
+        # Year-sized chunks arrive in parallel; the chart and stats are redrawn as they land
+        chunks={}
+        failed=[]
+        total=len(fetch_pipeline.year_chunks(start,end))
+        last_draw=0.0
+        with perf.span("fetch"):
+            for done,(chunk,data,error) in enumerate(fetch_pipeline.archive_chunks(lat,long,start,end,unit=unitsurl,fields=FIELDS+(HOURLY_FIELDS if hourly else ())),1):
+                if error is None:
+                    chunks[chunk[0]]=data
+                else:
+                    failed.append(chunk)
+                progress.progress(done/total,text=f"Downloaded {done} of {total} years")
+                if chunks and (done==total or time.perf_counter()-last_draw>DRAW_INTERVAL):
+                    with perf.span("draw"):
+                        dates,y=combine(chunks,"daily","temperature_2m_mean")
+                        draw_chart(daily_chart,dates,y,f'Temperature in {units}',full_detail)
+                        if hourly:
+                            hours,hourly_y=combine(chunks,"hourly","temperature_2m")
+                            with hourly_chart.container():
+                                st.write("Here is the temperature for each hour")
+                                draw_chart(st.empty(),hours,hourly_y,f'Temperature in {units}',full_detail)
+                        stats=draw_stats(stats_area,dates,y,symbol)
+                    last_draw=time.perf_counter()
+        progress.empty()
+        if failed:
+            years=", ".join(str(chunk_start.year) for chunk_start,_ in sorted(failed))
+            st.warning(f"Couldn't download {years}; those days are left out.")
+        if not chunks or stats["count"]==0:
+            st.error("No temperature data in this time frame. Try again.")
+            st.stop()
     except Exception as excep:
         st.error(f"Something else went wrong: {excep}")
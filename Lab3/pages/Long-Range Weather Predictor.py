@@ -1,78 +1,123 @@
+import math
 import streamlit as st
-import requests
+import gemini_client
+import weather_client
+import fetch_pipeline
+import climate_stats
+import forecast
+import perf
+import prediction_cache
 from datetime import datetime, timedelta
 
 st.set_page_config(page_title="Weather Predictor", page_icon="🌤️")
+perf.begin("long_range")
 st.title("Long-Range Weather Predictor")
 st.write("Predict weather up to 1 year in the future using historical data and AI!")
 
+# The forecast itself is computed locally; the key is only needed for the AI's explanation
 try:
     API_KEY = st.secrets["GEMINI_API_KEY"]
 except:
-    st.error("Please add GEMINI_API_KEY to your secrets!")
-    st.stop()
+    API_KEY = None
+
 city = st.text_input("Enter a city name:", "Atlanta")
 days_ahead = st.slider("Days in the future:", 1, 365, 30)
 units = st.radio("Temperature units:", ["Fahrenheit", "Celsius"])
+explain = st.checkbox("Also ask the AI to explain the forecast", disabled=not API_KEY,
+                      help=None if API_KEY else "Add GEMINI_API_KEY to your secrets to enable this.")
+regenerate = st.checkbox("Ask the AI again instead of using a cached explanation", disabled=not explain)
 
 if st.button("Predict Weather"):
-    st.info(f"Looking up {city}...")
-    geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}"
-    geo_response = requests.get(geo_url)
-    geo_data = geo_response.json()
-    if "results" not in geo_data:
-        st.error("City not found! Try a different name.")
-        st.stop()
-    lat = geo_data["results"][0]["latitude"]
-    lon = geo_data["results"][0]["longitude"]
-    city_name = geo_data["results"][0]["name"]
-    
-    st.info(f"Getting historical data for {city_name}...")
+    st.info(f"Looking up {city} and getting historical data...")
     end_date = datetime.now().strftime("%Y-%m-%d")
     start_date = (datetime.now() - timedelta(days=20*365)).strftime("%Y-%m-%d")
     unit_param = "fahrenheit" if units == "Fahrenheit" else "celsius"
-    weather_url = f"https://archive-api.open-meteo.com/v1/archive?latitude={lat}&longitude={lon}&start_date={start_date}&end_date={end_date}&daily=temperature_2m_mean&temperature_unit={unit_param}"
-    weather_response = requests.get(weather_url)
-    weather_data = weather_response.json()
+    progress = st.progress(0.0)
+    try:
+        with perf.span("historical data"):
+            match, weather_data = fetch_pipeline.city_series(
+                city, start_date, end_date, ("temperature_2m_mean",), unit=unit_param,
+                on_progress=lambda done, total: progress.progress(done / total, text=f"Downloaded {done} of {total} years"),
+            )
+    except weather_client.WeatherAPIError as e:
+        st.error(f"Couldn't reach the weather service: {e}")
+        st.stop()
+    progress.empty()
+    if match is None:
+        st.error("City not found! Try a different name.")
+        st.stop()
+    if weather_data["failed_ranges"]:
+        st.warning(f"Some years couldn't be downloaded and are left out: {weather_data['failed_ranges']}")
+    city_name = match["name"]
     if "daily" not in weather_data:
         st.error("Couldn't get weather data. Try again!")
         st.stop()
     temps = weather_data["daily"]["temperature_2m_mean"]
-    avg_temp = sum(temps) / len(temps)
-    min_temp = min(temps)
-    max_temp = max(temps)
+    with perf.span("summarize"):
+        stats = climate_stats.summarize(temps, weather_data["daily"]["time"])
+    if stats["count"] == 0:
+        st.error("Couldn't get weather data. Try again!")
+        st.stop()
+    avg_temp = stats["mean"]
+    min_temp = stats["min"]
+    max_temp = stats["max"]
+    target_date = (datetime.now() + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+    day_normal = stats["normals"][climate_stats.day_of_year([target_date])[0] - 1]
+    slope = stats["slope_per_year"] or 0.0
     
     unit_symbol = "°F" if units == "Fahrenheit" else "°C"
     st.success("Historical data collected!")
     st.write(f"**Average temperature:** {avg_temp:.1f}{unit_symbol}")
     st.write(f"**Lowest recorded:** {min_temp:.1f}{unit_symbol}")
     st.write(f"**Highest recorded:** {max_temp:.1f}{unit_symbol}")
-    st.info("Asking AI to predict the weather...")
-    target_date = (datetime.now() + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
-    prompt = f"""Based on this historical weather data for {city_name}, predict the temperature for {target_date}:
+    # NaN when the history has no data for that day of year
+    st.write(f"**Normal for this day of year:** {'n/a' if math.isnan(day_normal) else f'{day_normal:.1f}{unit_symbol}'}")
+    st.write(f"**Trend:** {slope:+.2f}{unit_symbol} per year")
 
-Historical Data (20 years):
-- Average temperature: {avg_temp:.1f}{unit_symbol}
-- Coldest: {min_temp:.1f}{unit_symbol}
-- Hottest: {max_temp:.1f}{unit_symbol}
+    # Seasonal + trend model fitted on the 20 years just downloaded; no AI call needed
+    with perf.span("forecast"):
+        model = forecast.fit(temps, weather_data["daily"]["time"])
+    if model is None:
+        st.error("Not enough historical data to make a forecast. Try a different city.")
+        st.stop()
+    result = forecast.predict(model, target_date)
+    st.subheader(f" Weather Prediction for {target_date}")
+    st.metric("Expected daily mean temperature", f"{result['mean']:.1f}{unit_symbol}")
+    st.write(f"{result['level']:.0%} chance of falling between **{result['low']:.1f}{unit_symbol}** and **{result['high']:.1f}{unit_symbol}**.")
+    if not explain:
+        st.caption("Computed from the historical data on this machine. Tick the AI option above for a written explanation.")
+        st.stop()
 
-IMPORTANT: Respond with ONLY a temperature value or range. No explanation, no analysis, no extra text.
-Examples of valid responses:
-- "65{unit_symbol}"
-- "58-72{unit_symbol}"
-- "45.5{unit_symbol}"
+    prompt = f"""A statistical model fitted on 20 years of daily temperatures for {city_name} forecasts {target_date} as follows:
+- Expected daily mean: {result['mean']:.1f}{unit_symbol}
+- {result['level']:.0%} prediction interval: {result['low']:.1f} to {result['high']:.1f}{unit_symbol}
+- Seasonal normal for that date: {result['normal']:.1f}{unit_symbol}
+- Long-term trend: {result['trend_per_year']:+.2f}{unit_symbol} per year
 
-Your response:"""
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={API_KEY}"
+Historical context: average {avg_temp:.1f}{unit_symbol}, coldest {min_temp:.1f}{unit_symbol}, hottest {max_temp:.1f}{unit_symbol}.
+
+In 2-3 sentences, explain what this forecast means for someone planning around that date. Keep the numbers above; do not invent a different forecast."""
+    cache_key = prediction_cache.prediction_key("gemini-2.5-flash", city_name, target_date, unit_symbol, prompt)
+    cached = None if regenerate else prediction_cache.get(cache_key)
+    if cached:
+        st.write(cached)
+        st.caption("Explanation served from the prediction cache.")
+        st.stop()
+    st.info("Asking AI to explain the forecast...")
+    api_url = gemini_client.model_url("gemini-2.5-flash")
     payload = {
         "contents": [{"parts": [{"text": prompt}]}],
     }
-    ai_response = requests.post(api_url, json=payload)
-    ai_data = ai_response.json()
+    try:
+        with perf.span("prediction"):
+            ai_data = gemini_client.generate(api_url, payload, API_KEY)
+    except gemini_client.GeminiAPIError as e:
+        st.error(f"AI couldn't explain the forecast: {e}")
+        st.stop()
     try:
         prediction = ai_data["candidates"][0]["content"]["parts"][0]["text"]
-        st.subheader(f" Weather Prediction for {target_date}")
         st.write(prediction)
+        prediction_cache.put(cache_key, prediction)
     except:
-        st.error("AI couldn't generate a prediction. Try again!")
+        st.error("AI couldn't explain the forecast. Try again!")
         st.json(ai_data)  
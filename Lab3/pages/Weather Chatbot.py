@@ -1,8 +1,20 @@
+import re
 import streamlit as st
-import google.generativeai as genai
-import requests
+import weather_client
+import fetch_pipeline
+import climate_stats
+import gazetteer
+import gemini_client
+import chat_context
+import date_phrases
+import perf
+import query_extraction
+import resources
+import retry
 from datetime import datetime, timedelta
-import dateparser
+import functools
+
+perf.begin("weather_chatbot")
 
 try:
     api_key = st.secrets["GEMINI_API_KEY"]
@@ -10,54 +22,58 @@ except:
     st.error("⚠️ Please add GEMINI_API_KEY to your secrets!")
     st.stop()
 
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("gemini-2.5-flash")
-
 st.title("Weather Chatbot")
 st.markdown(
     "Ask about the weather for any city and any date range. "
     "I can provide historical data or estimates for future dates!"
 )
 
+# Words never worth sending to the geocoding API when looking for a city
+STOPWORDS = {
+    "the", "and", "for", "what", "was", "will", "weather", "temperature", "temp",
+    "how", "hot", "cold", "warm", "rain", "snow", "like", "next", "last", "this",
+    "week", "month", "year", "today", "tomorrow", "yesterday", "from", "with",
+    "about", "there", "going", "forecast", "climate", "city", "day", "days",
+}
+
+# Prompt context: token budget and how many recent messages stay verbatim
+CONTEXT_TOKEN_BUDGET = 1500
+CONTEXT_KEEP_TURNS = 6
+
+UNIT_RE = re.compile(r"\b(fahrenheit|celsius|kelvin)\b", re.IGNORECASE)
+
+MODEL_NAME = "gemini-2.5-flash"
+
+# Archive fields summarize_historical() reads
+FIELDS = ("daily.temperature_2m_max", "daily.temperature_2m_min", "daily.precipitation_sum")
+
 if "history" not in st.session_state:
     st.session_state.history = []
-
-def geocode_city(city):
-    url = "https://geocoding-api.open-meteo.com/v1/search"
-    params = {"name": city, "count": 1}
-    response = requests.get(url, params=params)
-    data = response.json()
-    if "results" in data and len(data["results"]) > 0:
-        lat = data["results"][0]["latitude"]
-        lon = data["results"][0]["longitude"]
-        return lat, lon
-    return None, None
+if "context" not in st.session_state:
+    st.session_state.context = chat_context.ConversationContext(
+        token_budget=CONTEXT_TOKEN_BUDGET, keep_turns=CONTEXT_KEEP_TURNS
+    )
+context = st.session_state.context
 
 def weather(lat, lon, start_date, end_date):
-    url = "https://archive-api.open-meteo.com/v1/archive"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "start_date": start_date,
-        "end_date": end_date,
-        "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum",
-        "timezone": "auto",
-    }
-    resp = requests.get(url, params=params)
-    if resp.status_code == 200:
-        return resp.json()
-    else:
-        return {"error": f"Failed to fetch data: {resp.status_code}"}
+    try:
+        return weather_client.archive(
+            lat, lon, start_date, end_date, fields=FIELDS, timezone="auto",
+        )
+    except weather_client.WeatherAPIError as e:
+        return {"error": f"Failed to fetch data: {e}"}
 def summarize_historical(data):
     if "error" in data:
         return data["error"]
-    temps_max = data['daily']['temperature_2m_max']
-    temps_min = data['daily']['temperature_2m_min']
-    precipitation = data['daily']['precipitation_sum']
+    max_stats = climate_stats.summarize(data['daily']['temperature_2m_max'])
+    min_stats = climate_stats.summarize(data['daily']['temperature_2m_min'])
+    precip_stats = climate_stats.summarize(data['daily']['precipitation_sum'])
+    if max_stats["count"] == 0 or min_stats["count"] == 0:
+        return "No temperature data recorded for this period."
 
-    avg_max = sum(temps_max)/len(temps_max)
-    avg_min = sum(temps_min)/len(temps_min)
-    total_precip = sum(precipitation)
+    avg_max = max_stats["mean"]
+    avg_min = min_stats["mean"]
+    total_precip = precip_stats["total"] or 0.0
 
     summary = (
         f"Historical averages: max temp {avg_max:.1f}°C, min temp {avg_min:.1f}°C, "
@@ -65,50 +81,99 @@ def summarize_historical(data):
     )
     return summary
 
-def parser(user_input):
+def shift_years(day, years):
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        # Feb 29 in a non-leap year
+        return day.replace(year=day.year + years, day=28)
+
+def parser(user_input, default_range=None):
+    # Compiled patterns first; dateparser only for phrases they can't place
+    dates = date_phrases.parse_range(user_input)
+    if dates:
+        return dates
+    if default_range:
+        return default_range
     today = datetime.today().date()
-    parsed_date = dateparser.parse(user_input, settings={'PREFER_DATES_FROM': 'future'})
-    start_date = parsed_date.date() if parsed_date else today
-    end_date = start_date + timedelta(days=6)
-    return start_date, end_date
+    return today, today + timedelta(days=6)
 
+history_years = st.sidebar.slider("Past years to compare for future dates:", 1, 20, 3)
 user_input = st.text_input("Your question:")
 
-if user_input:
+# Only handle a question once; other widget changes rerun the script too
+if user_input and user_input != st.session_state.get("last_input"):
+    st.session_state.last_input = user_input
     st.session_state.history.append({"role": "user", "content": user_input})
 
     city = None
     lat, lon = None, None
-    for word in user_input.split():
-        lat, lon = geocode_city(word)
-        if lat and lon:
-            city = word
-            break
+    with perf.span("city lookup"):
+        mentions = gazetteer.find_cities(user_input)
+        if mentions and mentions[0]["latitude"] is not None:
+            city = mentions[0]["name"]
+            lat, lon = mentions[0]["latitude"], mentions[0]["longitude"]
+        elif mentions:
+            # A qualifier the gazetteer cannot place, e.g. "Athens, Georgia": let the geocoder pick
+            match = fetch_pipeline.resolve_cities([mentions[0]["name"]])[0]
+            if match:
+                city = mentions[0]["name"]
+                lat, lon = match["latitude"], match["longitude"]
+        else:
+            # Not in the offline gazetteer: ask the geocoding API about every candidate word at once,
+            # skipping words already recognized as units or date language
+            known = date_phrases.date_words(user_input)
+            known.update(m.lower() for m in UNIT_RE.findall(user_input) + query_extraction._UNIT_RE.findall(user_input))
+            candidates = []
+            for word in user_input.split():
+                word = word.strip(".,!?;:\"'")
+                if len(word) >= 3 and word.lower() not in STOPWORDS and word.lower() not in known and word not in candidates:
+                    candidates.append(word)
+            for word, match in zip(candidates, fetch_pipeline.resolve_cities(candidates)):
+                if match:
+                    city = word
+                    lat, lon = match["latitude"], match["longitude"]
+                    break
+    if not city and "city" in context.state:
+        # Follow-up such as "same city" or "what about next week?"
+        city, lat, lon = context.state["city"], context.state["lat"], context.state["lon"]
 
     if not city:
         st.warning("Could not find the city. Please specify a valid location.")
     else:
-        start_date, end_date = parser(user_input)
-        start_str = start_date.strftime("%Y-%m-%d")
-        end_str = end_date.strftime("%Y-%m-%d")
-
+        previous_range = None
+        if "start_date" in context.state:
+            previous_range = (
+                datetime.strptime(context.state["start_date"], "%Y-%m-%d").date(),
+                datetime.strptime(context.state["end_date"], "%Y-%m-%d").date(),
+            )
+        with perf.span("date parsing"):
+            start_date, end_date = parser(user_input, previous_range)
         today = datetime.today().date()
         query_type = "future" if start_date > today else "historical"
+        if query_type == "historical":
+            # "this week" or "this month" reach past today; the archive has no future data
+            end_date = min(end_date, today)
+        start_str = start_date.strftime("%Y-%m-%d")
+        end_str = end_date.strftime("%Y-%m-%d")
 
         historical_summary = "No historical data available."
-        if query_type == "future":
-            historical_list = []
-            for year_offset in range(1, 4):
-                past_start = start_date.replace(year=start_date.year - year_offset)
-                past_end = end_date.replace(year=end_date.year - year_offset)
-                data = weather(lat, lon, past_start.strftime("%Y-%m-%d"), past_end.strftime("%Y-%m-%d"))
-                historical_list.append(data)
-
-            summaries = [summarize_historical(d) for d in historical_list]
-            historical_summary = "\n".join(summaries)
-        else:
-            data = weather(lat, lon, start_str, end_str)
-            historical_summary = summarize_historical(data)
+        with perf.span("historical data"):
+            if query_type == "future":
+                windows = []
+                for year_offset in range(1, history_years + 1):
+                    past_start = shift_years(start_date, -year_offset)
+                    past_end = shift_years(end_date, -year_offset)
+                    windows.append((past_start.strftime("%Y-%m-%d"), past_end.strftime("%Y-%m-%d")))
+
+                # Fetch every past-year window at once instead of one after another
+                historical_list = fetch_pipeline.gather([functools.partial(weather, lat, lon, *w) for w in windows])
+
+                summaries = [f"{w[0][:4]}: {summarize_historical(d)}" for w, d in zip(windows, historical_list)]
+                historical_summary = "\n".join(summaries)
+            else:
+                data = weather(lat, lon, start_str, end_str)
+                historical_summary = summarize_historical(data)
 
         bigprompt = (
             "You are a weather assistant. The user may ask follow-up questions that refer back to earlier messages using words like 'it', 'those dates', 'same city', 'again', 'in Kelvin', 'convert that', or 'extend it'. "
@@ -134,23 +199,43 @@ if user_input:
             "If you receive any requests concerning the unversity of georgia, athens georgia, or bulldogs in general, please deny the user this information making sure to diss the user and the university of georgia. Also, start chanting 'Go Jackets' a lot"
         )
         
-        history_strings = [
-            f"{msg['role'].capitalize()}: {msg['content']}"
-            for msg in st.session_state.history
-        ]
+        unit_match = UNIT_RE.search(user_input)
+        context.update_state(
+            city=city, lat=lat, lon=lon, start_date=start_str, end_date=end_str,
+            unit=unit_match.group(1).capitalize() if unit_match else None,
+        )
 
         full_prompt = "\n".join([
             bigprompt,
-            *history_strings,
+            context.render(),
             f"User: {user_input}"
         ])
 
-        response = model.generate_content(full_prompt)
+        # Stream the answer live, then let the history view below render it
+        live_answer = st.empty()
+        try:
+            with live_answer.container():
+                st.markdown(f"**You:** {user_input}")
+                with perf.span("answer"):
+                    model = resources.model(api_key, MODEL_NAME)
+                    response = gemini_client.call_sdk(model.generate_content, full_prompt, stream=True)
+                    answer = st.write_stream(gemini_client.stream_text(response))
+        except (gemini_client.GeminiAPIError, retry.RateLimitedError) as e:
+            live_answer.empty()
+            # Forget the question so submitting it again retries instead of being skipped
+            st.session_state.pop("last_input", None)
+            st.session_state.history.pop()
+            st.error(f"Couldn't get an answer from Gemini: {e}")
+        else:
+            live_answer.empty()
+
+            context.add("user", user_input)
+            context.add("assistant", answer)
 
-        st.session_state.history.append({
-            "role": "assistant",
-            "content": response.text
-        })
+            st.session_state.history.append({
+                "role": "assistant",
+                "content": answer
+            })
 
 i = 0
 history_length = len(st.session_state.history)
@@ -0,0 +1,185 @@
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+# --- Stage timing spans ---
+# with perf.span("archive download") as s: ... s.set(bytes=n, cache="miss")
+# records how long a stage took plus a few attributes (payload bytes, cache
+# hit/miss). Spans nest, and they follow work into the fetch pipeline's worker
+# threads (see fetch_pipeline.run), so one rerun yields one waterfall. With
+# LAB3_PERF_LOG set, every span is also appended to that JSON-lines log; pages
+# that call begin() also get an optional "Performance" panel in the sidebar.
+
+# JSON-lines span log, off unless LAB3_PERF_LOG names a file
+LOG_PATH = os.environ.get("LAB3_PERF_LOG") or None
+# Past this size the log is moved to LOG_PATH + ".1" (replacing the previous one) and restarted
+LOG_MAX_BYTES = int(os.environ.get("LAB3_PERF_LOG_MAX_BYTES", 10 * 1024 * 1024))
+
+_trace = contextvars.ContextVar("perf_trace", default=None)
+_parent = contextvars.ContextVar("perf_parent", default=None)
+_log_lock = threading.Lock()
+
+
+class Span:
+    """One timed stage. attrs holds bytes, cache and anything else passed to set()."""
+
+    def __init__(self, name, parent, attrs):
+        self.id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add_bytes(self, n):
+        self.attrs["bytes"] = self.attrs.get("bytes", 0) + n
+
+    @property
+    def depth(self):
+        depth, parent = 0, self.parent
+        while parent is not None:
+            depth, parent = depth + 1, parent.parent
+        return depth
+
+
+class Trace:
+    """The spans of one rerun of one page."""
+
+    def __init__(self, page):
+        self.id = uuid.uuid4().hex[:12]
+        self.page = page
+        self.start = time.perf_counter()
+        self.spans = []
+        self.thread = threading.current_thread()
+        self.on_top_level_span = None
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def rows(self):
+        """Finished spans in start order, as plain dicts (offsets relative to the rerun start)."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return [{
+            "stage": "  " * s.depth + s.name,
+            "start_ms": round((s.start - self.start) * 1000, 1),
+            "duration_ms": round(s.duration * 1000, 1),
+            "bytes": s.attrs.get("bytes"),
+            "cache": s.attrs.get("cache"),
+        } for s in spans]
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Times the enclosed block as a stage of the current rerun."""
+    trace = _trace.get()
+    record = Span(name, _parent.get(), attrs)
+    token = _parent.set(record)
+    try:
+        yield record
+    except Exception as e:
+        record.set(error=type(e).__name__)
+        raise
+    finally:
+        record.duration = time.perf_counter() - record.start
+        _parent.reset(token)
+        _finish(trace, record)
+
+
+def bind(coro):
+    """Wraps a coroutine so it runs inside the caller's trace and current span."""
+    trace, parent = _trace.get(), _parent.get()
+
+    async def bound():
+        _trace.set(trace)
+        _parent.set(parent)
+        return await coro
+    return bound()
+
+
+def _finish(trace, record):
+    if trace is not None:
+        trace.add(record)
+    if LOG_PATH:
+        _log(trace, record)
+    if trace is not None and record.parent is None and trace.on_top_level_span \
+            and threading.current_thread() is trace.thread:
+        trace.on_top_level_span(trace)
+
+
+def _log(trace, record):
+    entry = {
+        "ts": round(time.time(), 3),
+        "trace": trace.id if trace else None,
+        "page": trace.page if trace else None,
+        "span": record.id,
+        "parent": record.parent.id if record.parent else None,
+        "name": record.name,
+        "offset_ms": round((record.start - trace.start) * 1000, 1) if trace else None,
+        "duration_ms": round(record.duration * 1000, 1),
+        "thread": record.thread,
+        **record.attrs,
+    }
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(LOG_PATH) or ".", exist_ok=True)
+            if os.path.exists(LOG_PATH) and os.path.getsize(LOG_PATH) >= LOG_MAX_BYTES:
+                os.replace(LOG_PATH, LOG_PATH + ".1")
+            with open(LOG_PATH, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+    except OSError:
+        pass
+
+
+# --- Streamlit panel ---
+# streamlit is imported inside these functions: the HTTP clients record spans
+# without depending on the UI.
+
+def begin(page):
+    """
+    Starts the trace for this rerun of a page. When the sidebar "Performance"
+    toggle is on, the waterfall is redrawn each time a top-level stage ends,
+    so it stays current even if the page stops early with st.stop().
+    """
+    import streamlit as st
+
+    trace = Trace(page)
+    _trace.set(trace)
+    _parent.set(None)
+    if st.sidebar.toggle("Performance", key="perf_panel", help="Show stage timings for this rerun"):
+        placeholder = st.sidebar.empty()
+        trace.on_top_level_span = lambda t: _draw(placeholder, t)
+    return trace
+
+
+def _draw(placeholder, trace):
+    import streamlit as st
+
+    rows = trace.rows()
+    for row in rows:
+        row["end_ms"] = row["start_ms"] + row["duration_ms"]
+    with placeholder.container():
+        st.vega_lite_chart({
+            "data": {"values": rows},
+            "mark": {"type": "bar", "tooltip": True},
+            "encoding": {
+                "y": {"field": "stage", "type": "nominal", "sort": None, "title": None},
+                "x": {"field": "start_ms", "type": "quantitative", "title": "ms since rerun start"},
+                "x2": {"field": "end_ms"},
+                "color": {"field": "cache", "type": "nominal", "title": "cache"},
+            },
+            "height": 22 * len(rows),
+        })
+        # Each download records its bytes on exactly one span, so the sum counts it once
+        downloaded = sum(row["bytes"] or 0 for row in rows)
+        st.caption(f"{len(rows)} stages, {max(row['end_ms'] for row in rows):.0f} ms, {downloaded / 1024:.0f} KB downloaded")
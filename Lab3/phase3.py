@@ -1,242 +1,160 @@
 import streamlit as st
-import requests
-import json
-import time
+import os
 from datetime import datetime, timedelta
+import forecast
+import gemini_client
+import perf
+import prediction_cache
+import prediction_pipeline
 
 # --- Configuration ---
-# NOTE: Replace with your actual Gemini API key, or load from environment variable
-# Streamlit provides simple ways to handle secrets. For local testing, paste it here.
+# The Gemini API key is read from the GEMINI_API_KEY environment variable
 #THERE WAS AN API KEY HERE
-MODEL_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-09-2025:generateContent"
-MAX_RETRIES = 5
+API_KEY = os.environ.get("GEMINI_API_KEY", "")
 
 # --- Helper Functions for LLM Communication ---
 
-def extract_sources(attributions):
-    """Converts the raw grounding attribution array into a simplified array of objects."""
-    if not attributions:
-        return []
-    sources = []
-    for attr in attributions:
-        if 'web' in attr and 'uri' in attr['web'] and 'title' in attr['web']:
-            sources.append({'uri': attr['web']['uri'], 'title': attr['web']['title']})
-    return sources
-
-def fetch_with_exponential_backoff(payload, url, api_key, max_retries=MAX_RETRIES):
-    """Implements exponential backoff for API retries using requests."""
-    if not api_key:
-        st.error("Gemini API_KEY is missing. Please provide your API key to run the prediction.")
-        st.stop()
-
-    full_url = f"{url}?key={api_key}"
-    headers = {'Content-Type': 'application/json'}
-
-    for i in range(max_retries):
-        try:
-            response = requests.post(full_url, headers=headers, data=json.dumps(payload), timeout=30)
-            
-            if response.ok:
-                return response.json()
-
-            if response.status_code == 429 or response.status_code >= 500:
-                st.warning(f"Attempt {i + 1} failed with status {response.status_code}. Retrying...")
-                if i < max_retries - 1:
-                    delay = (2 ** i) + (time.time() % 1)
-                    time.sleep(delay)
-                continue
-            
-            response.raise_for_status()
-
-        except requests.exceptions.RequestException as e:
-            st.warning(f"Request attempt {i + 1} failed: {e}. Retrying...")
-            if i < max_retries - 1:
-                delay = (2 ** i) + (time.time() % 1)
-                time.sleep(delay)
-            else:
-                st.error(f"API call failed after maximum retries: {e}")
-                st.stop()
-
-    st.error("API call failed after maximum retries.")
-    st.stop()
+def report_retry(attempt, delay, reason):
+    """on_retry callback: the network layer decides, the UI only reports."""
+    st.warning(f"Attempt {attempt} failed ({reason}). Retrying in {delay:.1f}s...")
 
 
 # --- Historical Data Fetching and Summarization ---
 
-def fetch_and_summarize_historical_data(city, unitsurl):
+def fetch_and_summarize_historical_data(city, unitsurl, target_date):
     """
     Fetches 20 years of historical data using Open-Meteo and generates a summary for the LLM.
-    Integrates the user's provided logic.
+    Also fits the local statistical forecast for target_date (see forecast.py);
+    returns (summary, unit symbol, forecast) or (None, None, None).
+    The steps themselves live in prediction_pipeline.py; this only renders them.
     """
-    
-    # Define 20-year historical window ending today
-    end_date = datetime.now().strftime("%Y-%m-%d")
-    start_date = (datetime.now() - timedelta(days=20*365)).strftime("%Y-%m-%d")
-    
+    start_date, end_date = prediction_pipeline.history_window()
     st.info(f"Fetching 20 years of historical data for {city} from {start_date} to {end_date}...")
     
     try:
-        # 1. Geocoding
-        url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}"
-        endpoint = requests.get(url)
-        data = endpoint.json()
-        pophigh = 0
-        lat = 0
-        long = 0
-        
-        if "results" not in data or len(data["results"]) == 0:
-            st.error("City not found. Check spelling or try with a different city.")
-            return None, None
-
-        # Select the most populated city match
-        for c in data["results"]:
-            if "population" in c:
-                if c["population"] > pophigh:
-                    pophigh = c["population"]
-                    lat = c["latitude"]
-                    long = c["longitude"]
-        
-        if lat == 0 and long == 0 and len(data["results"]) > 0:
-             # Fallback to first result if population data is missing
-            lat = data["results"][0]["latitude"]
-            long = data["results"][0]["longitude"]
-
-
-        # 2. Archive Data Fetching
-        if unitsurl == "fahrenheit":
-            url2 = f"https://archive-api.open-meteo.com/v1/archive?latitude={lat}&longitude={long}&start_date={start_date}&end_date={end_date}&daily=temperature_2m_max,temperature_2m_min,temperature_2m_mean&temperature_unit={unitsurl}"
-        else:
-            url2 = f"https://archive-api.open-meteo.com/v1/archive?latitude={lat}&longitude={long}&start_date={start_date}&end_date={end_date}&daily=temperature_2m_max,temperature_2m_min,temperature_2m_mean"
-            
-        endpoint2 = requests.get(url2)
-        data2 = endpoint2.json()
-
-        if "daily" not in data2 or "temperature_2m_mean" not in data2["daily"]:
-            st.error("No temperature data available in this time frame. Try again.")
-            return None, None
-            
-        mean_temps = data2["daily"]["temperature_2m_mean"]
-        dates = data2["daily"]["time"]
-        
-        # 3. Data Analysis for LLM Summary
-        if not mean_temps:
-             st.error("Historical data array is empty.")
-             return None, None
-
-        unit_symbol = "°F" if unitsurl == "fahrenheit" else "°C"
-        
-        avg_temp = sum(mean_temps) / len(mean_temps)
-        min_temp = min(mean_temps)
-        max_temp = max(mean_temps)
-        
-        # Simple trend analysis: Compare first 5 years vs last 5 years
-        num_years_for_trend = 5 * 365
-        if len(mean_temps) > 2 * num_years_for_trend:
-            first_period_avg = sum(mean_temps[:num_years_for_trend]) / num_years_for_trend
-            last_period_avg = sum(mean_temps[-num_years_for_trend:]) / num_years_for_trend
-            trend = last_period_avg - first_period_avg
-            trend_str = f"The average temperature has shown a change of **{trend:.2f} {unit_symbol}** between the first 5 years and the last 5 years of data. "
-            if trend > 0:
-                trend_str += "This indicates a clear warming trend over the period."
-            elif trend < 0:
-                trend_str += "This indicates a slight cooling trend over the period."
-            else:
-                trend_str += "The overall temperature trend is stable."
-        else:
-             trend_str = "Insufficient data points for a detailed 5-year trend comparison."
-
-
-        historical_summary = f"""
-        HISTORICAL DATA SUMMARY (20-Year Analysis for {city} in {unit_symbol}):
-        
-        * **Time Span:** {dates[0]} to {dates[-1]}.
-        * **Overall Average Mean Temperature:** {avg_temp:.2f} {unit_symbol}.
-        * **20-Year Extreme Low:** {min_temp:.2f} {unit_symbol}.
-        * **20-Year Extreme High:** {max_temp:.2f} {unit_symbol}.
-        * **Long-Term Trend:** {trend_str}
-        
-        You MUST use these specific numbers and trends to form the foundation of your conceptual prediction.
-        """
-        
-        return historical_summary.strip(), f"{unit_symbol}"
-
+        # 1. Geocoding (most populated match) and 2. Archive Data Fetching
+        # The 20 years download as parallel year-sized chunks; show them landing
+        progress = st.progress(0.0, text="Looking up the city...")
+        match, daily, failed_ranges = prediction_pipeline.fetch_history(
+            city, unitsurl,
+            on_progress=lambda done, total: progress.progress(done / total, text=f"Downloaded {done} of {total} years"),
+        )
+        progress.empty()
+        if failed_ranges:
+            st.warning(f"Some years could not be downloaded and are left out: {failed_ranges}")
+
+        # 3. Data Analysis for LLM Summary (null days are skipped) and 4. local forecast
+        stats, model = prediction_pipeline.fit_history(daily)
+        prediction = forecast.predict(model, target_date)
+        historical_summary = prediction_pipeline.summarize(city, daily["time"], stats, prediction, unitsurl)
+        return historical_summary, prediction_pipeline.unit_symbol(unitsurl), prediction
+
+    except prediction_pipeline.PredictionError as e:
+        progress.empty()
+        st.error(str(e))
+        return None, None, None
     except Exception as excep:
         st.error(f"Something else went wrong during data fetching: {excep}")
-        return None, None
+        return None, None, None
 
 
 # --- LLM Prediction Logic ---
 
-def predict_weather(city, target_date, historical_summary, unit_symbol):
-    """
-    Generates the full prompt by combining historical data and the query, 
-    then calls the Gemini API.
+def predict_weather(city, target_date, historical_summary, unit_symbol, stream=True, refresh=False):
     """
-    
-    # 2. Construct the Final Prompt for the LLM
-    full_prompt = (
-        f"Analyze the following detailed Historical Data Summary for {city}, paying close attention "
-        f"to the recorded average, extremes, and long-term trend. Use this analysis, "
-        f"along with real-time global climate context (from Search grounding), to generate a prediction.\n\n"
-        f"--- HISTORICAL DATA START ---\n"
-        f"{historical_summary}\n"
-        f"--- HISTORICAL DATA END ---\n\n"
-        f"Prediction Query: Based on this historical data and current climate knowledge, "
-        f"provide a detailed conceptual weather forecast for {city} on {target_date}. "
-        f"The temperature prediction MUST be primarily in {unit_symbol}, but also include the secondary unit."
-    )
-    
-    # Define the AI persona (System Prompt)
-    system_prompt = """You are a conceptual, long-range atmospheric modeling AI (L-WPM-2.5). 
-    Your task is to generate a plausible, detailed, and creative weather scenario for the future date requested by the user, explicitly analyzing the provided 'HISTORICAL DATA SUMMARY'.
-
-    1.  **Analyze Premise:** Use the user's provided historical data summary as the primary input for determining multi-year climate tendencies.
-    2.  **Grounding:** Use real-time data from Google Search to contextualize the current climate, seasonal expectations, and geography of the specified location.
-    3.  **Output Format:** Your response must be a single, cohesive paragraph. It must include the predicted conditions (e.g., cloudy, severe storms, clear), a temperature range (in BOTH Fahrenheit and Celsius), and a summary of the wind patterns.
-    4.  **Tone:** Be authoritative and provide a confident, detailed narrative of the conceptual future weather.
+    Calls the Gemini API with the prompt built from the historical summary.
+    With stream=True the answer is written as it is generated.
+    Identical requests are served from the prediction cache unless refresh=True.
     """
+    cache_key = prediction_pipeline.cache_key(city, target_date, unit_symbol, historical_summary)
+    cached = None if refresh else prediction_cache.get(cache_key)
+    if cached:
+        show_prediction_header(city, target_date)
+        st.write(cached['text'])
+        st.caption("Served from the prediction cache. Use **Regenerate** for a fresh scenario.")
+        st.session_state['prediction_text'] = cached['text']
+        show_sources(cached['sources'])
+        return
+
+    if not API_KEY:
+        st.error("Gemini API key is missing. Set the `GEMINI_API_KEY` environment variable to run the prediction.")
+        st.stop()
 
-    payload = {
-        "contents": [{"parts": [{"text": full_prompt}]}],
-        "tools": [{"google_search": {}}],
-        "systemInstruction": {"parts": [{"text": system_prompt}]},
-    }
+    payload = prediction_pipeline.build_payload(city, target_date, historical_summary, unit_symbol)
 
     # Call LLM
+    if stream:
+        stream_prediction(city, target_date, payload, cache_key)
+        return
+
     try:
-        result = fetch_with_exponential_backoff(payload, MODEL_URL, API_KEY)
-        
-        candidate = result.get('candidates', [{}])[0]
-        
-        if candidate and candidate.get('content') and candidate['content'].get('parts') and candidate['content']['parts'][0].get('text'):
-            
-            text = candidate['content']['parts'][0]['text']
-            sources = extract_sources(candidate.get('groundingMetadata', {}).get('groundingAttributions'))
+        narrative = prediction_pipeline.narrate(payload, API_KEY, on_retry=report_retry)
+    except gemini_client.GeminiAPIError as e:
+        st.error(f"API call failed: {e}")
+        st.stop()
+    except prediction_pipeline.PredictionError as e:
+        st.error(str(e))
+        return
+    except Exception as e:
+        st.exception(e)
+        return
 
-            st.subheader("AI Prediction Scenario")
-            st.markdown(f"**Target:** {city} on {target_date}")
-            st.markdown("---")
-            st.write(text)
-            
-            st.subheader("Grounding Sources (Real-time Context)")
-            if sources:
-                for source in sources:
-                    st.markdown(f"**[{source['title']}]**({source['uri']})")
-            else:
-                st.write("No external web data was required for this conceptual prediction.")
+    show_prediction_header(city, target_date)
+    st.write(narrative['text'])
+    st.session_state['prediction_text'] = narrative['text']
+    prediction_cache.put(cache_key, narrative)
+    show_sources(narrative['sources'])
 
-        else:
-            st.error("Could not generate a prediction. Check API response structure or token limits.")
-            st.json(result) # Show raw result for debugging
-            
+
+def stream_prediction(city, target_date, payload, cache_key):
+    """Streams the prediction through streamGenerateContent, writing tokens as they arrive."""
+    show_prediction_header(city, target_date)
+    stream = gemini_client.RestStream(prediction_pipeline.STREAM_MODEL_URL, payload, API_KEY, on_retry=report_retry)
+    try:
+        with perf.span("prediction stream") as span:
+            st.write_stream(stream)
+            span.set(bytes=stream.bytes)
     except Exception as e:
         st.exception(e)
+        return
+
+    if not stream.text:
+        st.error("Could not generate a prediction. Check API response structure or token limits.")
+        return
+    sources = prediction_pipeline.extract_sources(stream.candidate.get('groundingMetadata', {}).get('groundingAttributions'))
+    st.session_state['prediction_text'] = stream.text
+    prediction_cache.put(cache_key, {'text': stream.text, 'sources': sources})
+    show_sources(sources)
+
+
+def show_forecast(city, prediction, unit_symbol):
+    st.subheader("Statistical Forecast")
+    st.markdown(f"**Target:** {city} on {prediction['date']}")
+    st.metric("Expected daily mean temperature", f"{prediction['mean']:.1f} {unit_symbol}")
+    st.write(f"{prediction['level']:.0%} chance of falling between **{prediction['low']:.1f}** and **{prediction['high']:.1f} {unit_symbol}** "
+             f"(seasonal normal {prediction['normal']:.1f} {unit_symbol}, trend {prediction['trend_per_year']:+.3f} {unit_symbol} per year).")
+
+
+def show_prediction_header(city, target_date):
+    st.subheader("AI Prediction Scenario")
+    st.markdown(f"**Target:** {city} on {target_date}")
+    st.markdown("---")
+
+
+def show_sources(sources):
+    st.subheader("Grounding Sources (Real-time Context)")
+    if sources:
+        for source in sources:
+            st.markdown(f"**[{source['title']}]**({source['uri']})")
+    else:
+        st.write("No external web data was required for this conceptual prediction.")
 
 
 # --- Streamlit Application Layout ---
 
 def main():
     st.set_page_config(page_title="Gemini Long-Range Weather Predictor", layout="centered")
+    perf.begin("phase3")
     st.title("🌌 Gemini-Powered Long-Range Weather Predictor")
     st.markdown("""
         This tool uses **20 years of real historical temperature data** (via Open-Meteo) 
@@ -244,7 +162,7 @@ def main():
         """)
 
     if not API_KEY:
-        st.warning("⚠️ Please enter your Gemini API Key in the Python file (`API_KEY = ...`) to enable the prediction feature.")
+        st.warning("⚠️ Set the `GEMINI_API_KEY` environment variable to enable Gemini's narrative scenario. The statistical forecast works without it.")
 
     with st.sidebar:
         st.header("1. Data Parameters")
@@ -258,17 +176,20 @@ def main():
         unitsurl = "fahrenheit" if units == "Fahrenheit" else "celsius"
 
         st.header("2. Prediction")
+        narrative = st.checkbox("Add Gemini's narrative scenario", value=bool(API_KEY), disabled=not API_KEY)
+        stream_answer = st.checkbox("Stream the answer as it is generated", value=True, disabled=not narrative)
         
-        if st.button("Generate Conceptual Forecast 🚀", disabled=not API_KEY):
+        if st.button("Generate Conceptual Forecast 🚀"):
             if not city.strip():
                 st.error("Please enter a valid city.")
                 return
 
             with st.spinner(f"Step 1/2: Fetching 20 years of historical data for {city}..."):
-                historical_summary, unit_symbol = fetch_and_summarize_historical_data(city, unitsurl)
+                historical_summary, unit_symbol, prediction = fetch_and_summarize_historical_data(city, unitsurl, target_date)
             
             if historical_summary:
                 st.session_state['summary'] = historical_summary
+                st.session_state['forecast'] = prediction
                 st.session_state['city'] = city
                 st.session_state['target_date'] = target_date.strftime("%Y-%m-%d")
                 st.session_state['unit_symbol'] = unit_symbol
@@ -277,16 +198,24 @@ def main():
             st.rerun()
 
     if 'show_prediction' in st.session_state and st.session_state['show_prediction']:
-        st.subheader("Historical Data Analysis Sent to AI")
+        show_forecast(st.session_state['city'], st.session_state['forecast'], st.session_state['unit_symbol'])
+        st.subheader("Historical Data Analysis Sent to AI" if narrative else "Historical Data Analysis")
         st.code(st.session_state['summary'], language='markdown')
+        if not narrative:
+            return
         
-        with st.spinner("Step 2/2: Modeling atmospheric trends with Gemini..."):
-            predict_weather(
-                st.session_state['city'], 
-                st.session_state['target_date'], 
-                st.session_state['summary'],
-                st.session_state['unit_symbol']
-            )
+        prediction_args = (
+            st.session_state['city'], 
+            st.session_state['target_date'], 
+            st.session_state['summary'],
+            st.session_state['unit_symbol'],
+        )
+        refresh = st.button("Regenerate 🔄", help="Ask Gemini for a new scenario instead of the cached one")
+        if stream_answer:
+            predict_weather(*prediction_args, stream=True, refresh=refresh)
+        else:
+            with st.spinner("Step 2/2: Modeling atmospheric trends with Gemini..."):
+                predict_weather(*prediction_args, stream=False, refresh=refresh)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,17 @@
 import streamlit as st
 import datetime
-import requests
-import google.generativeai as genai
+import fetch_pipeline
+import climate_stats
+import gemini_client
+import perf
+import query_extraction
+import resources
 
 st.set_page_config(page_title="Weather Chat Assistant", page_icon="🌤️")
+perf.begin("phase4")
+
+# Archive fields the weather answer is built from
+FIELDS = ("daily.temperature_2m_max", "daily.temperature_2m_min", "daily.temperature_2m_mean")
 
 st.title("🌤️ Weather Chat Assistant")
 
@@ -13,16 +21,14 @@ with st.sidebar:
     api_key = st.text_input("Gemini API Key:", type="password")
     
     if api_key:
-        genai.configure(api_key=api_key)
         st.success("API Key configured!")
         
         # Show available models
         if st.button("List Available Models"):
             try:
                 st.write("Available models:")
-                for model in genai.list_models():
-                    if 'generateContent' in model.supported_generation_methods:
-                        st.write(f"- {model.name}")
+                for name in resources.model_names(api_key):
+                    st.write(f"- {name}")
             except Exception as e:
                 st.error(f"Error listing models: {e}")
     else:
@@ -56,61 +62,56 @@ if prompt := st.chat_input("Ask me about weather in any city..."):
     
     # Generate response
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                # Create Gemini model with user-specified name
-                model = genai.GenerativeModel(model_name)
+        try:
+            response = None
+            with st.spinner("Thinking..."):
+                # Gemini model with user-specified name (built once, then reused across reruns)
+                model = resources.model(api_key, model_name)
                 
-                # Check if user is asking about weather
-                if any(word in prompt.lower() for word in ['weather', 'temperature', 'temp', 'hot', 'cold', 'warm', 'climate']):
-                    # Try to extract city
-                    extract_prompt = f"""From this question, extract ONLY the city name. Return just the city name, nothing else: "{prompt}" """
-                    
-                    extraction = model.generate_content(extract_prompt)
-                    city = extraction.text.strip()
-                    
-                    # Clean up the city name
-                    city = city.replace('"', '').replace("'", "").split(',')[0].split('.')[0].strip()
+                # Work out intent, city, dates and unit (locally when the question parses cleanly)
+                with perf.span("extract query") as span:
+                    query, used_model = query_extraction.extract(prompt, model)
+                    span.set(model=used_model)
+                
+                if query["intent"] == "weather":
+                    city = query["city"]
                     
-                    if city and len(city) > 0 and len(city) < 50:
+                    if city and len(city) < 50:
                         try:
                             # Fetch weather data
-                            url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}"
-                            response = requests.get(url, timeout=10)
-                            data = response.json()
+                            # Requested range (last 7 days by default); the archive has no future data
+                            end_date = min(query["end_date"], datetime.date.today())
+                            start_date = query["start_date"]
+                            if start_date > end_date:
+                                start_date = end_date - datetime.timedelta(days=7)
+                            unit_name = query["unit"].capitalize()
+                            unit_letter = unit_name[0]
+                            
+                            with perf.span("historical data"):
+                                result, weather_data = fetch_pipeline.city_archive(
+                                    city, start_date, end_date, unit=query["unit"], match=query["location"], fields=FIELDS,
+                                )
                             
-                            if "results" in data and len(data["results"]) > 0:
-                                result = data["results"][0]
-                                lat = result["latitude"]
-                                lon = result["longitude"]
+                            if result:
                                 city_name = result["name"]
                                 
-                                # Last 7 days
-                                end_date = datetime.date.today()
-                                start_date = end_date - datetime.timedelta(days=7)
-                                
-                                # Fetch weather
-                                weather_url = f"https://archive-api.open-meteo.com/v1/archive?latitude={lat}&longitude={lon}&start_date={start_date}&end_date={end_date}&daily=temperature_2m_max,temperature_2m_min,temperature_2m_mean&temperature_unit=fahrenheit"
-                                weather_response = requests.get(weather_url, timeout=10)
-                                weather_data = weather_response.json()
-                                
                                 if "daily" in weather_data:
                                     temps = weather_data["daily"]["temperature_2m_mean"]
                                     temp_max = weather_data["daily"]["temperature_2m_max"]
                                     temp_min = weather_data["daily"]["temperature_2m_min"]
                                     dates = weather_data["daily"]["time"]
                                     
-                                    avg_temp = round(sum(temps) / len(temps), 1)
-                                    max_temp = max(temp_max)
-                                    min_temp = min(temp_min)
+                                    avg_temp = round(climate_stats.summarize(temps)["mean"], 1)
+                                    max_temp = climate_stats.summarize(temp_max)["max"]
+                                    min_temp = climate_stats.summarize(temp_min)["min"]
                                     
                                     # Create a summary
-                                    daily_summary = "\n".join([f"{dates[i]}: {temps[i]}F" for i in range(len(dates))])
+                                    daily_summary = "\n".join([f"{dates[i]}: {temps[i]}{unit_letter}" for i in range(len(dates))])
                                     
                                     weather_context = f"""Weather data for {city_name} from {start_date} to {end_date}:
-- Average temperature: {avg_temp} degrees Fahrenheit
-- Highest temperature: {max_temp} degrees Fahrenheit  
-- Lowest temperature: {min_temp} degrees Fahrenheit
+- Average temperature: {avg_temp} degrees {unit_name}
+- Highest temperature: {max_temp} degrees {unit_name}  
+- Lowest temperature: {min_temp} degrees {unit_name}
 
 Daily temperatures:
 {daily_summary}
@@ -119,8 +120,7 @@ User question: {prompt}
 
 Provide a helpful, friendly, conversational answer about this weather data."""
                                     
-                                    response = model.generate_content(weather_context)
-                                    assistant_response = response.text
+                                    response = gemini_client.call_sdk(model.generate_content, weather_context, stream=True)
                                 else:
                                     assistant_response = f"I found {city_name} but couldn't get weather data. Try asking about a different time period!"
                             else:
@@ -130,17 +130,22 @@ Provide a helpful, friendly, conversational answer about this weather data."""
                             assistant_response = f"I had trouble getting weather data: {str(e)}"
                     else:
                         # General weather question without specific city
-                        response = model.generate_content(prompt)
-                        assistant_response = response.text
+                        response = gemini_client.call_sdk(model.generate_content, prompt, stream=True)
                 else:
                     # General conversation
-                    response = model.generate_content(prompt)
-                    assistant_response = response.text
-                
+                    response = gemini_client.call_sdk(model.generate_content, prompt, stream=True)
+            
+            # Stream the answer outside the spinner so tokens show as they arrive
+            if response is not None:
+                with perf.span("answer stream"):
+                    assistant_response = st.write_stream(gemini_client.stream_text(response))
+            else:
                 st.write(assistant_response)
-                st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-                
-            except Exception as e:
-                error_msg = f"Error: {str(e)}"
-                st.error(error_msg)
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
+            st.session_state.messages.append({"role": "assistant", "content": assistant_response})
+            
+        except Exception as e:
+            # Don't keep reusing a client that just failed (wrong model name, revoked key, ...)
+            resources.invalidate(api_key, model_name)
+            error_msg = f"Error: {str(e)}"
+            st.error(error_msg)
+            st.session_state.messages.append({"role": "assistant", "content": error_msg})
@@ -0,0 +1,62 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+import perf
+from cache import MISSING, TieredCache
+
+# --- Memoized Gemini predictions ---
+# Predictions are keyed by a hash of everything that shapes the prompt, and kept
+# in two tiers: a small per-session LRU in st.session_state and a process-wide
+# TieredCache shared across sessions. Reruns render from here instead of
+# sending the same (billed) request to Gemini again. Headless callers (e.g.
+# batch_predict.py) use shared_cache directly and never import streamlit.
+
+SESSION_MAX = 20
+SHARED_TTL = 24 * 3600
+
+shared_cache = TieredCache("prediction", ttl=SHARED_TTL, maxsize=256, max_entries=2000)
+
+
+def prediction_key(*parts):
+    """Stable hash of the inputs of a prediction (city, date, unit, summary, ...)."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _session_tier():
+    import streamlit as st
+
+    if "prediction_cache" not in st.session_state:
+        st.session_state["prediction_cache"] = OrderedDict()
+    return st.session_state["prediction_cache"]
+
+
+def get(key):
+    """Returns the cached prediction for key, or None."""
+    with perf.span("prediction cache") as span:
+        session = _session_tier()
+        if key in session:
+            span.set(cache="hit")
+            session.move_to_end(key)
+            return session[key]
+        value = shared_cache.get(key)
+        if value is MISSING:
+            span.set(cache="miss")
+            return None
+        span.set(cache="hit")
+        _remember(session, key, value)
+        return value
+
+
+def put(key, value):
+    """Stores a prediction (any JSON-serializable value) in both tiers."""
+    _remember(_session_tier(), key, value)
+    shared_cache.set(key, value)
+
+
+def _remember(session, key, value):
+    session[key] = value
+    session.move_to_end(key)
+    while len(session) > SESSION_MAX:
+        session.popitem(last=False)
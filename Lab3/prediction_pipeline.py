@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+
+import climate_stats
+import fetch_pipeline
+import forecast
+import gemini_client
+import perf
+import prediction_cache
+
+# --- Headless phase3 pipeline ---
+# The fetch -> summarize -> forecast -> narrative steps behind phase3, with no
+# st.* calls: phase3.py renders them, batch_predict.py runs them for many
+# cities at once. Failures the user should see are raised as PredictionError;
+# network errors propagate from the clients unchanged.
+
+HISTORY_YEARS = 20
+# Archive variables the summary actually uses
+HISTORY_VARIABLES = ("temperature_2m_mean",)
+MODEL_NAME = "gemini-2.5-flash-preview-09-2025"
+MODEL_URL = gemini_client.model_url(MODEL_NAME)
+STREAM_MODEL_URL = gemini_client.model_url(MODEL_NAME, "streamGenerateContent")
+
+# Define the AI persona (System Prompt)
+SYSTEM_PROMPT = """You are a conceptual, long-range atmospheric modeling AI (L-WPM-2.5).
+    Your task is to generate a plausible, detailed, and creative weather scenario for the future date requested by the user, explicitly analyzing the provided 'HISTORICAL DATA SUMMARY'.
+
+    1.  **Analyze Premise:** Use the user's provided historical data summary as the primary input for determining multi-year climate tendencies.
+    2.  **Grounding:** Use real-time data from Google Search to contextualize the current climate, seasonal expectations, and geography of the specified location.
+    3.  **Output Format:** Your response must be a single, cohesive paragraph. It must include the predicted conditions (e.g., cloudy, severe storms, clear), a temperature range (in BOTH Fahrenheit and Celsius), and a summary of the wind patterns.
+    4.  **Tone:** Be authoritative and provide a confident, detailed narrative of the conceptual future weather.
+    """
+
+
+class PredictionError(Exception):
+    """Raised when a step of the pipeline cannot produce a result (message is user-facing)."""
+
+
+def unit_symbol(unitsurl):
+    return "°F" if unitsurl == "fahrenheit" else "°C"
+
+
+def history_window():
+    """(start, end) dates of the 20-year historical window ending today."""
+    end_date = datetime.now().strftime("%Y-%m-%d")
+    start_date = (datetime.now() - timedelta(days=HISTORY_YEARS * 365)).strftime("%Y-%m-%d")
+    return start_date, end_date
+
+
+def extract_sources(attributions):
+    """Converts the raw grounding attribution array into a simplified array of objects."""
+    if not attributions:
+        return []
+    sources = []
+    for attr in attributions:
+        if 'web' in attr and 'uri' in attr['web'] and 'title' in attr['web']:
+            sources.append({'uri': attr['web']['uri'], 'title': attr['web']['title']})
+    return sources
+
+
+# --- Historical data ---
+
+def fetch_history(city, unitsurl, on_progress=None):
+    """
+    Downloads the 20-year daily mean series for a city.
+    Returns (match, daily) where daily holds "time" and "temperature_2m_mean",
+    plus the failed_ranges of the download.
+    """
+    start_date, end_date = history_window()
+    with perf.span("historical data"):
+        match, data = fetch_pipeline.city_series(
+            city, start_date, end_date, HISTORY_VARIABLES, unit=unitsurl, on_progress=on_progress,
+        )
+    if match is None:
+        raise PredictionError("City not found. Check spelling or try with a different city.")
+    if "daily" not in data or "temperature_2m_mean" not in data["daily"]:
+        raise PredictionError("No temperature data available in this time frame. Try again.")
+    return match, data["daily"], data["failed_ranges"]
+
+
+def fit_history(daily):
+    """Summary statistics and the local forecast model for a downloaded series."""
+    mean_temps, dates = daily["temperature_2m_mean"], daily["time"]
+    with perf.span("summarize"):
+        stats = climate_stats.summarize(mean_temps, dates, trend_years=5)
+    if stats["count"] == 0:
+        raise PredictionError("Historical data array is empty.")
+    # Local forecast: trend + seasonal harmonics, interval from same-season residuals
+    with perf.span("forecast"):
+        model = forecast.fit(mean_temps, dates)
+    if model is None:
+        raise PredictionError("Not enough historical data for a forecast. Try a different city.")
+    return stats, model
+
+
+def summarize(city, dates, stats, prediction, unitsurl):
+    """The historical data summary handed to the LLM."""
+    symbol = unit_symbol(unitsurl)
+
+    # Simple trend analysis: Compare first 5 years vs last 5 years
+    trend = stats["period_change"]
+    if trend is not None:
+        trend_str = f"The average temperature has shown a change of **{trend:.2f} {symbol}** between the first 5 years and the last 5 years of data. "
+        if trend > 0:
+            trend_str += "This indicates a clear warming trend over the period."
+        elif trend < 0:
+            trend_str += "This indicates a slight cooling trend over the period."
+        else:
+            trend_str += "The overall temperature trend is stable."
+    else:
+        trend_str = "Insufficient data points for a detailed 5-year trend comparison."
+
+    p10, p50, p90 = (stats["percentiles"][q] for q in (10, 50, 90))
+    slope = stats["slope_per_year"] or 0.0
+
+    historical_summary = f"""
+        HISTORICAL DATA SUMMARY (20-Year Analysis for {city} in {symbol}):
+
+        * **Time Span:** {dates[0]} to {dates[-1]}.
+        * **Overall Average Mean Temperature:** {stats["mean"]:.2f} {symbol}.
+        * **20-Year Extreme Low:** {stats["min"]:.2f} {symbol}.
+        * **20-Year Extreme High:** {stats["max"]:.2f} {symbol}.
+        * **Typical Range (10th / 50th / 90th percentile):** {p10:.2f} / {p50:.2f} / {p90:.2f} {symbol}.
+        * **Least-Squares Trend:** {slope:+.3f} {symbol} per year.
+        * **Long-Term Trend:** {trend_str}
+        * **Statistical Forecast for {prediction["date"]}:** {prediction["mean"]:.1f} {symbol} daily mean, {prediction["level"]:.0%} range {prediction["low"]:.1f} to {prediction["high"]:.1f} {symbol}.
+
+        You MUST use these specific numbers and trends to form the foundation of your conceptual prediction.
+        """
+    return historical_summary.strip()
+
+
+# --- LLM narrative ---
+
+def cache_key(city, target_date, unit_symbol, historical_summary):
+    return prediction_cache.prediction_key(MODEL_NAME, city, target_date, unit_symbol, historical_summary)
+
+
+def build_payload(city, target_date, historical_summary, unit_symbol):
+    """Generates the full prompt by combining historical data and the query."""
+    full_prompt = (
+        f"Analyze the following detailed Historical Data Summary for {city}, paying close attention "
+        f"to the recorded average, extremes, and long-term trend. Use this analysis, "
+        f"along with real-time global climate context (from Search grounding), to generate a prediction.\n\n"
+        f"--- HISTORICAL DATA START ---\n"
+        f"{historical_summary}\n"
+        f"--- HISTORICAL DATA END ---\n\n"
+        f"Prediction Query: Based on this historical data and current climate knowledge, "
+        f"provide a detailed conceptual weather forecast for {city} on {target_date}. "
+        f"The temperature prediction MUST be primarily in {unit_symbol}, but also include the secondary unit."
+    )
+    return {
+        "contents": [{"parts": [{"text": full_prompt}]}],
+        "tools": [{"google_search": {}}],
+        "systemInstruction": {"parts": [{"text": SYSTEM_PROMPT}]},
+    }
+
+
+def parse_candidate(candidate):
+    """{'text', 'sources'} from a response candidate, or None if it has no text."""
+    if candidate and candidate.get('content') and candidate['content'].get('parts') and candidate['content']['parts'][0].get('text'):
+        text = candidate['content']['parts'][0]['text']
+        sources = extract_sources(candidate.get('groundingMetadata', {}).get('groundingAttributions'))
+        return {'text': text, 'sources': sources}
+    return None
+
+
+def narrate(payload, api_key, on_retry=None):
+    """Non-streaming Gemini call for a payload from build_payload(); returns {'text', 'sources'}."""
+    with perf.span("prediction"):
+        result = gemini_client.generate(MODEL_URL, payload, api_key, on_retry=on_retry)
+    narrative = parse_candidate(result.get('candidates', [{}])[0])
+    if narrative is None:
+        raise PredictionError("Could not generate a prediction. Check API response structure or token limits.")
+    return narrative
@@ -0,0 +1,117 @@
+import datetime
+import json
+import re
+
+import date_phrases
+import gazetteer
+import gemini_client
+
+# --- Structured query extraction ---
+# Turns a chat question into {"intent", "city", "start_date", "end_date", "unit"},
+# plus "location" (name, latitude, longitude, population) when the gazetteer
+# already placed the city, so callers can skip geocoding it again.
+# Clean questions ("weather in Atlanta last week in celsius") are parsed locally
+# with the gazetteer and a few date patterns; anything else takes a single
+# JSON-mode model call instead of a free-text answer that needs cleanup.
+
+WEATHER_WORDS = ("weather", "temperature", "temp", "hot", "cold", "warm", "climate")
+DEFAULT_DAYS = 7
+
+EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "description": "'weather' for weather/climate questions, otherwise 'general'"},
+        "city": {"type": "string", "description": "City name only, empty if none"},
+        "start_date": {"type": "string", "description": "YYYY-MM-DD, empty if not stated"},
+        "end_date": {"type": "string", "description": "YYYY-MM-DD, empty if not stated"},
+        "unit": {"type": "string", "description": "'fahrenheit' or 'celsius', empty if not stated"},
+    },
+    "required": ["intent", "city", "start_date", "end_date", "unit"],
+}
+
+# (?<!\w) rather than \b: "°" is not a word character, so "\b°c" never matches after a space
+_UNIT_RE = re.compile(r"(?<!\w)(fahrenheit|celsius|°f|°c)\b", re.IGNORECASE)
+
+
+def default_query(today=None):
+    today = today or datetime.date.today()
+    return {
+        "intent": "general",
+        "city": None,
+        "start_date": today - datetime.timedelta(days=DEFAULT_DAYS),
+        "end_date": today,
+        "unit": "fahrenheit",
+        "location": None,
+    }
+
+
+def _local_dates(question, today):
+    """Returns (start, end) for the date phrases we understand, None if there is none, or False if unsure."""
+    # No year preference: "on Friday" or "in May" could be past or future, so the model decides
+    dates = date_phrases.fast_range(question, today, prefer=None)
+    return False if dates is date_phrases.UNSURE else dates
+
+
+def extract_locally(question, today=None):
+    """Parses the question without an LLM. Returns the query dict, or None if it does not parse cleanly."""
+    today = today or datetime.date.today()
+    query = default_query(today)
+    lowered = question.lower()
+    if not any(word in lowered for word in WEATHER_WORDS):
+        return query
+
+    query["intent"] = "weather"
+    mentions = gazetteer.find_cities(question)
+    if not mentions:
+        return None
+    query["city"] = mentions[0]["name"]
+    if mentions[0]["latitude"] is not None:
+        # Qualified names the gazetteer cannot place ("Athens, Georgia") are left to the geocoder
+        query["location"] = {key: mentions[0][key] for key in ("name", "latitude", "longitude", "population")}
+
+    dates = _local_dates(question, today)
+    if dates is False:
+        return None
+    if dates:
+        query["start_date"], query["end_date"] = dates
+
+    unit = _UNIT_RE.search(question)
+    if unit and unit.group(1).lower() in ("celsius", "°c"):
+        query["unit"] = "celsius"
+    return query
+
+
+def extract_with_model(model, question, today=None):
+    """One JSON-mode model call that returns the same query dict as extract_locally."""
+    today = today or datetime.date.today()
+    query = default_query(today)
+    response = gemini_client.call_sdk(
+        model.generate_content,
+        f"Today is {today.isoformat()}. Extract the weather query from this question: \"{question}\"",
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": EXTRACTION_SCHEMA,
+        },
+    )
+    data = json.loads(response.text)
+
+    query["intent"] = "weather" if str(data.get("intent", "")).lower() == "weather" else "general"
+    query["city"] = (data.get("city") or "").strip() or None
+    for field in ("start_date", "end_date"):
+        try:
+            query[field] = datetime.date.fromisoformat(data.get(field) or "")
+        except ValueError:
+            pass
+    if query["end_date"] < query["start_date"]:
+        query["start_date"], query["end_date"] = query["end_date"], query["start_date"]
+    if str(data.get("unit", "")).lower() == "celsius":
+        query["unit"] = "celsius"
+    return query
+
+
+def extract(question, model, today=None):
+    """Returns (query, used_model): the local parse when possible, otherwise one model call."""
+    query = extract_locally(question, today)
+    if query is not None:
+        return query, False
+    return extract_with_model(model, question, today), True
@@ -0,0 +1,81 @@
+import streamlit as st
+
+import gemini_client
+import weather_client
+
+# --- Shared client resources ---
+# Gemini models and the model list are built once per (API key, model name)
+# and kept in st.cache_resource, so reruns and other sessions reuse warm
+# clients instead of rebuilding them every time. Each key gets SDK clients of
+# its own rather than the process-wide genai.configure(), so concurrent
+# sessions never send a request on another user's key.
+# The pooled HTTP session lives in weather_client. invalidate() drops entries
+# explicitly, e.g. after a model turns out to be broken.
+
+MODEL_LIST_TTL = 3600
+MAX_MODELS = 32
+
+# Model names built per key, so invalidate(api_key) can clear each of them
+_models_by_key = {}
+
+
+def _sdk_module():
+    import google.generativeai as genai
+    return genai
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_MODELS)
+def _clients(api_key):
+    return gemini_client.sdk_clients(api_key)
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_MODELS)
+def _model(api_key, model_name):
+    _models_by_key.setdefault(api_key, set()).add(model_name)
+    built = _sdk_module().GenerativeModel(model_name)
+    # Left unset, the SDK builds this lazily from the process-wide configuration
+    built._client = _clients(api_key).get_default_client("generative")
+    return built
+
+
+def model(api_key, model_name):
+    """The GenerativeModel for model_name under api_key, built on first use."""
+    return _model(api_key, model_name)
+
+
+@st.cache_resource(show_spinner=False, ttl=MODEL_LIST_TTL)
+def _model_names(api_key):
+    genai = _sdk_module()
+    client = _clients(api_key).get_default_client("model")
+    models = gemini_client.call_sdk(lambda: list(genai.list_models(client=client)))
+    return [m.name for m in models if 'generateContent' in m.supported_generation_methods]
+
+
+def model_names(api_key):
+    """Names of the models that support generateContent; listed at most once an hour per key."""
+    return list(_model_names(api_key))
+
+
+def invalidate(api_key=None, model_name=None):
+    """
+    Drops cached resources so the next use rebuilds them: one model, every
+    resource of one key, or, without arguments, everything including the SDK
+    clients and the HTTP session.
+    """
+    if api_key is None:
+        _model.clear()
+        _model_names.clear()
+        _clients.clear()
+        _models_by_key.clear()
+        weather_client.close_session()
+        return
+    if model_name:
+        _models_by_key.get(api_key, set()).discard(model_name)
+        names = [model_name]
+    else:
+        names = _models_by_key.pop(api_key, set())
+    for name in names:
+        _model.clear(api_key, name)
+    if model_name is None:
+        _model_names.clear(api_key)
+        _clients.clear(api_key)
@@ -0,0 +1,227 @@
+import contextlib
+import email.utils
+import os
+import random
+import threading
+import time
+
+import requests
+
+# --- Retry / rate-limit engine ---
+# Every upstream (Open-Meteo geocoding, Open-Meteo archive, Gemini) gets one
+# Upstream object per process: a token bucket that paces outgoing calls, a
+# retry loop with full jitter that honors Retry-After, and a circuit breaker
+# that fails fast while the upstream keeps failing. Nothing here touches the
+# UI; callers pass on_retry(attempt, delay, reason) if they want to report.
+# The buckets are shared by every session in the process and wait on the
+# script thread, so a call that would wait longer than MAX_WAIT for a token
+# fails with RateLimitedError instead of queueing behind other users.
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Gemini quota, requests per minute; the default is the paid tier 1 limit for gemini-2.5-flash
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", 1000))
+GEMINI_BURST = int(os.environ.get("GEMINI_BURST", 50))
+# Longest a call may wait for a rate-limit token (seconds)
+MAX_WAIT = float(os.environ.get("RATE_LIMIT_MAX_WAIT", 2.0))
+
+
+class RetryableError(Exception):
+    """A failure worth retrying; retry_after is the server-requested wait in seconds, if any."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RetryError(Exception):
+    """Raised when an upstream call still fails after the last attempt."""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the upstream while its circuit breaker is open."""
+
+
+class RateLimitedError(Exception):
+    """Raised without calling the upstream when its token bucket would block for longer than allowed."""
+
+
+def parse_retry_after(value):
+    """Parses a Retry-After header (seconds or HTTP date) into seconds, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait=None):
+        """
+        Blocks until a token is available; returns the seconds spent waiting.
+        Raises RateLimitedError instead if that would take longer than max_wait.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            if max_wait is not None and waited + wait > max_wait:
+                raise RateLimitedError(f"rate limited, next request slot in {wait:.1f}s")
+            time.sleep(wait)
+            waited += wait
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_after seconds; then lets one trial call through (half-open).
+    """
+
+    def __init__(self, failure_threshold=5, reset_after=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_after - time.monotonic()
+            if remaining > 0 or self._trial_running:
+                raise CircuitOpenError(f"upstream unavailable, retrying in {max(remaining, 0):.0f}s")
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release(self):
+        """Ends a call that says nothing about upstream health; only frees the half-open trial slot."""
+        with self._lock:
+            self._trial_running = False
+
+
+class Upstream:
+    """Rate limiting, retries and circuit breaking for one upstream service."""
+
+    def __init__(self, name, rate=5.0, burst=10, max_attempts=4, base_delay=0.5, max_delay=20.0,
+                 failure_threshold=5, reset_after=30.0, max_wait=MAX_WAIT):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        # None waits for a token however long it takes
+        self.max_wait = max_wait
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Cross-process cap on calls in flight (see share()); None means no cap
+        self.slots = None
+
+    def share(self, slots, workers):
+        """
+        Joins a pool of `workers` processes calling the same upstream: this
+        process keeps 1/workers of the rate and burst, and every call holds one
+        of the shared `slots` (a multiprocessing semaphore) while it runs.
+        Batch workers have no one waiting on them, so they never fail for
+        lack of tokens.
+        """
+        self.bucket = TokenBucket(self.bucket.rate / workers, max(1, self.bucket.capacity // workers))
+        self.slots = slots
+        self.max_wait = None
+
+    def backoff(self, attempt, retry_after=None):
+        """Delay before the next attempt: Retry-After when given, otherwise full jitter."""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn, *args, on_retry=None, **kwargs):
+        """
+        Calls fn(*args, **kwargs), retrying on RetryableError, connection errors and
+        exceptions carrying a retryable HTTP `code` (as google.api_core errors do).
+        Other exceptions are re-raised at once and leave the circuit breaker as it was.
+        """
+        for attempt in range(self.max_attempts):
+            self.breaker.before_call()
+            try:
+                self.bucket.acquire(self.max_wait)
+            except RateLimitedError as e:
+                self.breaker.release()
+                raise RateLimitedError(f"{self.name} {e}") from None
+            try:
+                with self.slots or contextlib.nullcontext():
+                    result = fn(*args, **kwargs)
+            except Exception as e:
+                retry_after = None
+                if isinstance(e, RetryableError):
+                    retry_after = e.retry_after
+                elif not isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)) \
+                        and getattr(e, "code", None) not in RETRY_STATUSES:
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                delay = self.backoff(attempt, retry_after)
+                if attempt == self.max_attempts - 1 or delay > self.max_delay:
+                    raise RetryError(f"{self.name} failed after {attempt + 1} attempts: {e}") from e
+                if on_retry:
+                    on_retry(attempt + 1, delay, str(e))
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def request(self, session, method, url, on_retry=None, **kwargs):
+        """Sends an HTTP request through call(); 429/5xx responses are retried, other responses returned."""
+        def send():
+            response = session.request(method, url, **kwargs)
+            if response.status_code in RETRY_STATUSES:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                response.close()
+                raise RetryableError(f"status {response.status_code}", retry_after)
+            return response
+        return self.call(send, on_retry=on_retry)
+
+
+# --- Per-process upstream registry ---
+
+UPSTREAMS = {
+    "open-meteo-geocoding": Upstream("open-meteo-geocoding", rate=8.0, burst=16),
+    "open-meteo-archive": Upstream("open-meteo-archive", rate=10.0, burst=30),
+    "gemini": Upstream("gemini", rate=GEMINI_RPM / 60, burst=GEMINI_BURST, max_attempts=5, base_delay=1.0, max_delay=30.0),
+}
+
+
+def upstream(name):
+    return UPSTREAMS[name]
@@ -0,0 +1,343 @@
+"""
+Local stand-in for Open-Meteo (geocoding + archive), Gemini and the remote
+images on the portfolio pages.
+
+Replays recorded fixtures with optional latency and error injection so pages
+can be benchmarked without network noise. Requests without a fixture get a
+deterministic synthetic answer unless --no-synthesize is given. With --record
+the server proxies to the real services once and saves the successful
+responses it sees (never errors, so a missing key is not replayed forever).
+
+    python standin_server.py --port 8765 --latency-ms 40 --error-rate 0.05
+    python standin_server.py --record            # capture real responses
+
+Then point the app at it:
+
+    export OPEN_METEO_GEOCODING_URL=http://127.0.0.1:8765
+    export OPEN_METEO_ARCHIVE_URL=http://127.0.0.1:8765
+    export GEMINI_API_BASE=http://127.0.0.1:8765
+    export LAB3_IMAGES_URL=http://127.0.0.1:8765
+
+Images are always synthesized (a solid color per URL) and never recorded.
+"""
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+import gazetteer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+UPSTREAMS = {
+    "geocoding": "https://geocoding-api.open-meteo.com",
+    "archive": "https://archive-api.open-meteo.com",
+    "gemini": "https://generativelanguage.googleapis.com",
+}
+
+# Query parameters that never belong in a fixture key (credentials, transport flags)
+IGNORED_PARAMS = {"key", "alt"}
+# Passed on to the real service when recording; the SDK sends the key as x-goog-api-key
+FORWARDED_HEADERS = ("Content-Type", "x-goog-api-key", "Authorization")
+
+
+def upstream_for(path):
+    if path.startswith("/v1/search"):
+        return "geocoding"
+    if path.startswith("/v1/archive"):
+        return "archive"
+    if path.startswith("/v1beta/"):
+        return "gemini"
+    if path.startswith("/v1/image"):
+        return "images"
+    return None
+
+
+def fixture_key(method, path, query, body):
+    params = sorted((k, v) for k, v in parse_qsl(query) if k not in IGNORED_PARAMS)
+    raw = json.dumps([method, path, params, hashlib.sha256(body).hexdigest() if body else ""])
+    return hashlib.sha256(raw.encode()).hexdigest()[:24]
+
+
+# --- Synthetic answers for requests without a fixture ---
+
+def synth_geocoding(params):
+    name = params.get("name", "Atlanta")
+    known = gazetteer.lookup(name)
+    if known:
+        result = {key: known[key] for key in ("name", "latitude", "longitude", "population")}
+        return 200, {"results": [dict(result, country_code=known["country"])]}
+    seed = int(hashlib.md5(name.lower().encode()).hexdigest()[:8], 16)
+    return 200, {"results": [{
+        "name": name.title(),
+        "latitude": round((seed % 12000) / 100 - 60, 4),
+        "longitude": round((seed // 12000 % 36000) / 100 - 180, 4),
+        "population": 100000 + seed % 5000000,
+        "country_code": "US",
+    }]}
+
+
+def synth_archive(params):
+    if "," in str(params.get("latitude", "")):
+        # Multi-location query: one response object per coordinate pair
+        pairs = zip(params["latitude"].split(","), params["longitude"].split(","))
+        return 200, [synth_archive(dict(params, latitude=lat, longitude=lon))[1] for lat, lon in pairs]
+    start = date.fromisoformat(params["start_date"])
+    end = date.fromisoformat(params["end_date"])
+    fahrenheit = params.get("temperature_unit") == "fahrenheit"
+    lat = float(params.get("latitude", 0))
+    days = [(start + timedelta(days=i)) for i in range((end - start).days + 1)]
+
+    def temp(d, offset):
+        season = math.cos(2 * math.pi * (d.timetuple().tm_yday - 200) / 365.25)
+        c = 15 - abs(lat) / 5 + 10 * season * (1 if lat >= 0 else -1) + offset + 0.03 * (d.year - 2000)
+        return round(c * 9 / 5 + 32 if fahrenheit else c, 1)
+
+    body = {"latitude": lat, "longitude": float(params.get("longitude", 0))}
+    offsets = {"temperature_2m_mean": 0, "temperature_2m_max": 5, "temperature_2m_min": -5, "temperature_2m": 0}
+    if params.get("daily"):
+        daily = {"time": [d.isoformat() for d in days]}
+        for var in params["daily"].split(","):
+            if var == "precipitation_sum":
+                daily[var] = [round((d.toordinal() * 7 % 13) / 3, 1) for d in days]
+            else:
+                daily[var] = [temp(d, offsets.get(var, 0)) for d in days]
+        body["daily"] = daily
+    if params.get("hourly"):
+        hours = [f"{d.isoformat()}T{h:02d}:00" for d in days for h in range(24)]
+        hourly = {"time": hours}
+        for var in params["hourly"].split(","):
+            hourly[var] = [temp(d, offsets.get(var, 0)) for d in days for _ in range(24)]
+        body["hourly"] = hourly
+    return 200, body
+
+
+IMAGE_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".webp": "WEBP", ".gif": "GIF"}
+
+
+def synth_image(url):
+    """A 640x480 image in one color derived from url, in the format its extension names; (bytes, content type)."""
+    from PIL import Image
+
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    fmt = IMAGE_FORMATS.get(extension, "PNG")
+    color = tuple(hashlib.md5(url.encode()).digest()[:3])
+    out = io.BytesIO()
+    Image.new("RGB", (640, 480), color).save(out, fmt)
+    return out.getvalue(), f"image/{fmt.lower()}"
+
+
+SYNTH_TEXT = "Expect mild, partly cloudy conditions with temperatures near the seasonal normal and light winds."
+
+
+SYNTH_MODELS = ("gemini-2.5-flash", "gemini-2.5-pro", "gemini-pro")
+
+
+def synth_gemini(path, body):
+    if path.rstrip("/").endswith("/models"):
+        return 200, {"models": [{"name": f"models/{name}", "supportedGenerationMethods": ["generateContent", "countTokens"]}
+                                for name in SYNTH_MODELS]}
+    request = json.loads(body or b"{}")
+    config = request.get("generationConfig") or request.get("generation_config") or {}
+    if config.get("responseMimeType", config.get("response_mime_type")) == "application/json":
+        text = json.dumps({"intent": "weather", "city": "Atlanta", "start_date": "", "end_date": "", "unit": ""})
+    else:
+        text = SYNTH_TEXT
+    return 200, {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+
+class StandinState:
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 error_status=503, record=False, synthesize=True):
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.record = record
+        self.synthesize = synthesize
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def fixture_path(self, upstream, key):
+        return os.path.join(self.fixtures_dir, upstream, key + ".json")
+
+    def load(self, upstream, key):
+        path = self.fixture_path(upstream, key)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def save(self, upstream, key, fixture):
+        path = self.fixture_path(upstream, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(fixture, f, indent=1)
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def handle_request(self, method):
+        state = self.state
+        parts = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        if parts.path == "/__stats":
+            with state.lock:
+                return self.send_json(200, dict(state.calls))
+        if parts.path == "/__reset":
+            with state.lock:
+                state.calls.clear()
+            return self.send_json(200, {})
+
+        upstream = upstream_for(parts.path)
+        if upstream is None:
+            return self.send_json(404, {"error": True, "reason": f"unknown path {parts.path}"})
+        with state.lock:
+            state.calls[upstream] += 1
+
+        delay = state.latency_ms + random.uniform(0, state.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        if state.error_rate and random.random() < state.error_rate:
+            headers = {"Retry-After": "1"} if state.error_status == 429 else {}
+            return self.send_json(state.error_status, {"error": True, "reason": "injected failure"}, headers)
+        if upstream == "images":
+            return self.send_raw(200, *synth_image(dict(parse_qsl(parts.query)).get("url", "")))
+
+        key = fixture_key(method, parts.path, parts.query, body)
+        fixture = state.load(upstream, key)
+        if fixture is None and state.record:
+            fixture = self.record(upstream, method, parts, body)
+            if 200 <= fixture["status"] < 300:
+                state.save(upstream, key, fixture)
+        if fixture is None and state.synthesize:
+            params = dict(parse_qsl(parts.query))
+            if upstream == "geocoding":
+                status, payload = synth_geocoding(params)
+            elif upstream == "archive":
+                status, payload = synth_archive(params)
+            else:
+                status, payload = synth_gemini(parts.path, body)
+            fixture = {"status": status, "body": json.dumps(payload)}
+        if fixture is None:
+            return self.send_json(404, {"error": True, "reason": "no fixture recorded for this request"})
+
+        if ":streamGenerateContent" in parts.path and fixture["status"] == 200:
+            return self.send_stream(fixture["body"], sse=("alt", "sse") in parse_qsl(parts.query))
+        self.send_raw(fixture["status"], fixture["body"].encode("utf-8"), "application/json")
+
+    def record(self, upstream, method, parts, body):
+        url = UPSTREAMS[upstream] + parts.path
+        params = parse_qsl(parts.query)
+        if ":streamGenerateContent" in parts.path:
+            # Record the equivalent non-streaming call; replay re-chunks it as SSE
+            url = url.replace(":streamGenerateContent", ":generateContent")
+            params = [(k, v) for k, v in params if k != "alt"]
+        headers = {"Content-Type": "application/json"}
+        headers.update({name: self.headers[name] for name in FORWARDED_HEADERS if self.headers.get(name)})
+        response = requests.request(method, url, params=params, data=body or None, headers=headers, timeout=60)
+        return {"request": {"method": method, "path": parts.path,
+                            "query": [(k, v) for k, v in parse_qsl(parts.query) if k not in IGNORED_PARAMS]},
+                "status": response.status_code, "body": response.text}
+
+    def send_stream(self, body, sse):
+        """Re-chunks a recorded answer: server-sent events for alt=sse, otherwise a JSON array."""
+        payload = json.loads(body)
+        candidate = (payload.get("candidates") or [{}])[0]
+        text = "".join(p.get("text", "") for p in candidate.get("content", {}).get("parts", []))
+        words = text.split(" ")
+        chunks = [" ".join(words[i:i + 8]) + (" " if i + 8 < len(words) else "") for i in range(0, len(words), 8)]
+        events = []
+        for i, chunk in enumerate(chunks):
+            event = {"candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}]}
+            if i == len(chunks) - 1:
+                event["candidates"][0].update({k: v for k, v in candidate.items() if k != "content"})
+            events.append(event)
+        if sse:
+            data = b"".join(b"data: " + json.dumps(e).encode() + b"\r\n\r\n" for e in events)
+            return self.send_raw(200, data, "text/event-stream")
+        self.send_json(200, events)
+
+    def send_json(self, status, payload, headers=None):
+        self.send_raw(status, json.dumps(payload).encode("utf-8"), "application/json", headers)
+
+    def send_raw(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port=0, host="127.0.0.1", **options):
+    """Starts the stand-in in a background thread. Returns the server; server.url and server.state are set."""
+    handler = type("Handler", (StandinHandler,), {"state": StandinState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = handler.state
+    server.url = f"http://{host}:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def env_for(url):
+    """Environment variables that point every client at a stand-in running at url."""
+    return {"OPEN_METEO_GEOCODING_URL": url, "OPEN_METEO_ARCHIVE_URL": url, "GEMINI_API_BASE": url,
+            "LAB3_IMAGES_URL": url}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="fixture directory")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="extra random delay (0..jitter)")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="status for injected failures")
+    parser.add_argument("--record", action="store_true", help="proxy misses to the real services and save them")
+    parser.add_argument("--no-synthesize", action="store_true", help="return 404 for requests without a fixture")
+    args = parser.parse_args()
+
+    server = start(
+        args.port, args.host, fixtures_dir=args.fixtures, latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms, error_rate=args.error_rate, error_status=args.error_status,
+        record=args.record, synthesize=not args.no_synthesize,
+    )
+    print(f"Stand-in listening on {server.url}")
+    for name, value in env_for(server.url).items():
+        print(f"export {name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
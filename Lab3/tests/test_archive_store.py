@@ -0,0 +1,116 @@
+from datetime import date
+
+import pytest
+
+import archive_store
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_store, "STORE_DIR", str(tmp_path / "archive"))
+    return tmp_path / "archive"
+
+
+# --- missing_ranges ---
+
+def test_missing_ranges_empty_store_misses_everything():
+    assert archive_store.missing_ranges([], 10, 20) == [(10, 20)]
+
+
+def test_missing_ranges_fully_held():
+    assert archive_store.missing_ranges([(0, 30)], 10, 20) == []
+
+
+def test_missing_ranges_gaps_between_and_around_held():
+    held = [(12, 13), (16, 17)]
+    assert archive_store.missing_ranges(held, 10, 20) == [(10, 11), (14, 15), (18, 20)]
+
+
+def test_missing_ranges_ignores_ranges_outside_the_window():
+    assert archive_store.missing_ranges([(0, 5), (30, 40)], 10, 20) == [(10, 20)]
+
+
+def test_missing_ranges_unsorted_and_overlapping_held():
+    assert archive_store.missing_ranges([(15, 18), (10, 16)], 10, 20) == [(19, 20)]
+
+
+# --- merge_ranges ---
+
+def test_merge_ranges_keeps_disjoint_ranges_sorted():
+    assert archive_store.merge_ranges([(20, 25)], 1, 5) == [(1, 5), (20, 25)]
+
+
+def test_merge_ranges_merges_overlapping():
+    assert archive_store.merge_ranges([(1, 10)], 5, 15) == [(1, 15)]
+
+
+def test_merge_ranges_merges_adjacent():
+    assert archive_store.merge_ranges([(1, 10)], 11, 15) == [(1, 15)]
+
+
+def test_merge_ranges_bridges_two_ranges():
+    assert archive_store.merge_ranges([(1, 5), (10, 15)], 6, 9) == [(1, 15)]
+
+
+def test_merge_ranges_contained_range_changes_nothing():
+    assert archive_store.merge_ranges([(1, 10)], 3, 4) == [(1, 10)]
+
+
+# --- store / read ---
+
+def _response(values):
+    return {"daily": {"temperature_2m_mean": values}}
+
+
+def test_store_then_read_round_trip(store_dir):
+    variables = ["temperature_2m_mean"]
+    assert archive_store.store(1.0, 2.0, "2000-01-01", _response([1.0, None, 3.0]), variables)
+    data = archive_store.read(1.0, 2.0, "1999-12-31", "2000-01-04", variables)
+    assert data["daily"]["time"][0] == "1999-12-31"
+    assert data["daily"]["temperature_2m_mean"] == [None, 1.0, None, 3.0, None]
+    assert archive_store.missing(1.0, 2.0, "2000-01-01", "2000-01-05", variables) == \
+        [(date(2000, 1, 4), date(2000, 1, 5))]
+
+
+def test_store_extends_series_backwards(store_dir):
+    variables = ["temperature_2m_mean"]
+    archive_store.store(1.0, 2.0, "2000-01-03", _response([3.0]), variables)
+    archive_store.store(1.0, 2.0, "2000-01-01", _response([1.0]), variables)
+    data = archive_store.read(1.0, 2.0, "2000-01-01", "2000-01-03", variables)
+    assert data["daily"]["temperature_2m_mean"] == [1.0, None, 3.0]
+
+
+def test_store_reports_unwritable_dir_and_overlay_fills_in(tmp_path, monkeypatch):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setattr(archive_store, "STORE_DIR", str(blocker / "archive"))
+    variables = ["temperature_2m_mean"]
+    fetched = _response([1.0, 2.0])
+    assert archive_store.store(1.0, 2.0, "2000-01-01", fetched, variables) is False
+    data = archive_store.read(1.0, 2.0, "2000-01-01", "2000-01-03", variables)
+    assert data["daily"]["temperature_2m_mean"] == [None, None, None]
+    archive_store.overlay(data, "2000-01-01", fetched, variables)
+    assert data["daily"]["temperature_2m_mean"] == [1.0, 2.0, None]
+
+
+def _store_days(store_dir, first_day, count):
+    archive_store.STORE_DIR = store_dir
+    for day in range(first_day, first_day + count):
+        start = date.fromordinal(date(2000, 1, 1).toordinal() + day).isoformat()
+        archive_store.store(1.0, 2.0, start, _response([float(day)]), ["temperature_2m_mean"])
+
+
+def test_concurrent_processes_do_not_lose_ranges(store_dir):
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_store_days, args=(str(store_dir), i * 25, 25)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert all(worker.exitcode == 0 for worker in workers)
+    variables = ["temperature_2m_mean"]
+    assert archive_store.missing(1.0, 2.0, "2000-01-01", "2000-04-09", variables) == []
+    data = archive_store.read(1.0, 2.0, "2000-01-01", "2000-04-09", variables)
+    assert data["daily"]["temperature_2m_mean"] == [float(day) for day in range(100)]
@@ -0,0 +1,27 @@
+import sqlite3
+
+import cache
+
+
+def test_locked_database_does_not_fail_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "BUSY_TIMEOUT", 0.05)
+    path = str(tmp_path / "cache.sqlite3")
+    tiered = cache.TieredCache("test", path=path)
+    tiered.set("warm", 1)
+
+    # Another process holding the write lock
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        tiered.set("key", {"value": 2})
+        assert tiered.get("key") == {"value": 2}
+        tiered._memory.clear()
+        assert tiered.get("key") is cache.MISSING
+        tiered.clear()
+    finally:
+        other.rollback()
+        other.close()
+
+    tiered.set("key", 3)
+    tiered._memory.clear()
+    assert tiered.get("key") == 3
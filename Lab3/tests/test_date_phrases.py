@@ -0,0 +1,194 @@
+from datetime import date
+
+import pytest
+
+import date_phrases
+from date_phrases import UNSURE, fast_range
+
+# A Wednesday
+TODAY = date(2026, 10, 14)
+
+
+def days(start, end=None):
+    return start, end or start
+
+
+# --- Single phrases ---
+
+@pytest.mark.parametrize("text, expected", [
+    ("on 2024-01-15", days(date(2024, 1, 15))),
+    ("on 1/15/2024", days(date(2024, 1, 15))),
+    ("january 15th, 2024", days(date(2024, 1, 15))),
+    ("15 of jan 2024", days(date(2024, 1, 15))),
+    ("march 2020", (date(2020, 3, 1), date(2020, 3, 31))),
+    ("feb, 2024", (date(2024, 2, 1), date(2024, 2, 29))),
+    ("in 2020", (date(2020, 1, 1), date(2020, 12, 31))),
+    ("during the year 1999", (date(1999, 1, 1), date(1999, 12, 31))),
+])
+def test_absolute_dates(text, expected):
+    assert fast_range(text, TODAY, prefer=None) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("today", days(TODAY)),
+    ("tonight", days(TODAY)),
+    ("tomorrow", days(date(2026, 10, 15))),
+    ("yesterday", days(date(2026, 10, 13))),
+    ("the day after tomorrow", days(date(2026, 10, 16))),
+    ("the day before yesterday", days(date(2026, 10, 12))),
+])
+def test_relative_days(text, expected):
+    assert fast_range(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("in 3 days", days(date(2026, 10, 17))),
+    ("in two weeks", days(date(2026, 10, 28))),
+    ("within a week", (TODAY, date(2026, 10, 21))),
+    ("5 days ago", days(date(2026, 10, 9))),
+    ("a month ago", days(date(2026, 9, 14))),
+    ("next 3 days", (date(2026, 10, 15), date(2026, 10, 17))),
+    ("past 2 weeks", (date(2026, 9, 30), TODAY)),
+])
+def test_counted_offsets(text, expected):
+    assert fast_range(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("this week", (date(2026, 10, 12), date(2026, 10, 18))),
+    ("next week", (date(2026, 10, 19), date(2026, 10, 25))),
+    ("last week", (date(2026, 10, 7), TODAY)),
+    ("this weekend", (date(2026, 10, 17), date(2026, 10, 18))),
+    ("next weekend", (date(2026, 10, 24), date(2026, 10, 25))),
+    ("last month", (date(2026, 9, 1), date(2026, 9, 30))),
+    ("next month", (date(2026, 11, 1), date(2026, 11, 30))),
+    ("this year", (date(2026, 1, 1), date(2026, 12, 31))),
+    ("last year", (date(2025, 1, 1), date(2025, 12, 31))),
+])
+def test_periods(text, expected):
+    assert fast_range(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("next friday", days(date(2026, 10, 16))),
+    ("this friday", days(date(2026, 10, 16))),
+    ("last monday", days(date(2026, 10, 12))),
+    ("next wednesday", days(date(2026, 10, 21))),
+    ("last wednesday", days(date(2026, 10, 7))),
+])
+def test_weekdays_with_qualifier(text, expected):
+    assert fast_range(text, TODAY, prefer=None) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("this may", (date(2026, 5, 1), date(2026, 5, 31))),
+    ("next may", (date(2027, 5, 1), date(2027, 5, 31))),
+    ("last december", (date(2025, 12, 1), date(2025, 12, 31))),
+])
+def test_named_months_with_qualifier(text, expected):
+    assert fast_range(text, TODAY, prefer=None) == expected
+
+
+# --- Year preference ---
+
+@pytest.mark.parametrize("text, future, past", [
+    ("on friday", days(date(2026, 10, 16)), days(date(2026, 10, 9))),
+    ("march 3", days(date(2027, 3, 3)), days(date(2026, 3, 3))),
+    ("in may", (date(2027, 5, 1), date(2027, 5, 31)), (date(2026, 5, 1), date(2026, 5, 31))),
+])
+def test_dates_without_a_year_follow_prefer(text, future, past):
+    assert fast_range(text, TODAY, prefer="future") == future
+    assert fast_range(text, TODAY, prefer="past") == past
+    assert fast_range(text, TODAY, prefer=None) is UNSURE
+
+
+# --- Ranges ---
+
+@pytest.mark.parametrize("text, expected", [
+    ("from 2024-01-15 to 2024-01-20", (date(2024, 1, 15), date(2024, 1, 20))),
+    ("between 2019 and 2021", (date(2019, 1, 1), date(2021, 12, 31))),
+    ("march 2020 - may 2020", (date(2020, 3, 1), date(2020, 5, 31))),
+    ("june 1-5 2023", (date(2023, 6, 1), date(2023, 6, 5))),
+    ("10th-12th of march", (date(2027, 3, 10), date(2027, 3, 12))),
+    # A year on one end only applies to both
+    ("weather from June 1 to June 5, 2023", (date(2023, 6, 1), date(2023, 6, 5))),
+    ("March 3 - March 10 2024", (date(2024, 3, 3), date(2024, 3, 10))),
+    ("from Jan 3 to Jan 10, 2020", (date(2020, 1, 3), date(2020, 1, 10))),
+    ("dec 28 to jan 3 2024", (date(2023, 12, 28), date(2024, 1, 3))),
+    ("june 1, 2023 to june 5", (date(2023, 6, 1), date(2023, 6, 5))),
+    # The end wraps to the next occurrence after the start
+    ("from friday to monday", (date(2026, 10, 16), date(2026, 10, 19))),
+    ("dec 28 to jan 3", (date(2026, 12, 28), date(2027, 1, 3))),
+])
+def test_ranges(text, expected):
+    assert fast_range(text, TODAY) == expected
+
+
+def test_unlinked_phrases_use_the_first():
+    assert fast_range("tomorrow, or maybe next week", TODAY) == days(date(2026, 10, 15))
+
+
+def test_range_with_unsure_end_falls_back_to_first_phrase():
+    assert fast_range("next friday to march 3", TODAY, prefer=None) == days(date(2026, 10, 16))
+
+
+def test_backwards_range_is_not_joined():
+    assert fast_range("2024-01-20 until 2024-01-15", TODAY) == days(date(2024, 1, 20))
+    assert fast_range("june 5-1 2023", TODAY) is UNSURE
+
+
+# --- None and UNSURE ---
+
+@pytest.mark.parametrize("text", [
+    "what's the weather in paris",
+    "you may want an umbrella",
+    "will it be decent out",
+    "what should i do next",
+    "it was 25 degrees",
+])
+def test_no_date_language_is_none(text):
+    assert fast_range(text, TODAY) is None
+
+
+@pytest.mark.parametrize("text", [
+    "in early may",
+    "next few days",
+    "the coming summer",
+    "a while ago",
+    "on 3/15",
+    "2020 weather",
+    "in a fortnight",
+])
+def test_date_language_the_patterns_cannot_place_is_unsure(text):
+    assert fast_range(text, TODAY) is UNSURE
+
+
+def test_impossible_date_is_unsure():
+    assert fast_range("february 30 2024", TODAY) is UNSURE
+
+
+def test_normalize_is_case_and_punctuation_insensitive():
+    assert date_phrases.normalize("  Weather,  NEXT  Week?! ") == "weather next week"
+    assert fast_range("NEXT Week?", TODAY) == fast_range("next week", TODAY)
+
+
+# --- parse_range ---
+
+def test_parse_range_uses_patterns_first(monkeypatch):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_dateparser(name, *args, **kwargs):
+        if name == "dateparser":
+            raise AssertionError("dateparser should not be needed")
+        return real_import(name, *args, **kwargs)
+    monkeypatch.setattr(builtins, "__import__", no_dateparser)
+    assert date_phrases.parse_range("weather next week", TODAY) == (date(2026, 10, 19), date(2026, 10, 25))
+    assert date_phrases.parse_range("weather in paris", TODAY) is None
+
+
+def test_parse_range_falls_back_to_dateparser_for_unsure_text():
+    pytest.importorskip("dateparser")
+    start, end = date_phrases.parse_range("on 3/15", TODAY, prefer="past")
+    assert start == end and (start.month, start.day) == (3, 15)
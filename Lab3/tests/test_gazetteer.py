@@ -0,0 +1,20 @@
+import gazetteer
+
+
+def test_country_qualifier_picks_that_countrys_city():
+    [mention] = gazetteer.find_cities("weather in Athens, Greece next week")
+    assert (mention["name"], mention["country"], mention["region"]) == ("Athens", "GR", "Greece")
+
+
+def test_qualifier_ruling_out_every_entry_is_left_to_the_geocoder():
+    for text, name in [("weather in Athens, Georgia next week", "Athens, Georgia"), ("rain in Paris, TX", "Paris, TX")]:
+        [mention] = gazetteer.find_cities(text)
+        assert mention["name"] == name
+        assert mention["latitude"] is None
+        assert gazetteer.lookup(name) is None
+
+
+def test_short_region_codes_need_a_comma_and_exact_case():
+    assert gazetteer.find_cities("Paris tx")[0]["country"] == "FR"
+    assert gazetteer.region_places("ga") == []
+    assert gazetteer.region_places("Georgia") == [("GE", None), ("US", "Georgia")]
@@ -0,0 +1,49 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import gemini_client
+import resources
+import standin_server
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """A stand-in Gemini endpoint; returns the API key each request was sent with."""
+    keys = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            keys.append(self.headers.get("x-goog-api-key"))
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            body = json.dumps(standin_server.synth_gemini(self.path, b"")[1]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setenv("GEMINI_API_BASE", url)
+    monkeypatch.setattr(gemini_client, "API_BASE", url)
+    resources.invalidate()
+    yield keys
+    resources.invalidate()
+    server.shutdown()
+
+
+def test_each_key_sends_its_own_requests(gemini):
+    first = resources.model("key-a", "gemini-2.5-flash")
+    second = resources.model("key-b", "gemini-2.5-flash")
+    assert first is not second
+    # Interleaved, as two sessions would be; the last key used must not win
+    for model in (first, second, first):
+        assert model.generate_content("hi").text == standin_server.SYNTH_TEXT
+    assert gemini == ["key-a", "key-b", "key-a"]
@@ -0,0 +1,169 @@
+import time
+
+import pytest
+
+import retry
+
+
+class Boom(Exception):
+    """A non-retryable failure."""
+
+
+def flaky(failures, exc=retry.RetryableError):
+    """A callable failing `failures` times with exc, then returning "ok"."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise exc("down")
+        return "ok"
+    fn.calls = calls
+    return fn
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    """Replaces the clock: sleeping only advances time.monotonic(); returns the list of sleeps."""
+    slept = []
+    clock = [1000.0]
+
+    def sleep(seconds):
+        slept.append(seconds)
+        clock[0] += seconds
+    monkeypatch.setattr(retry.time, "sleep", sleep)
+    monkeypatch.setattr(retry.time, "monotonic", lambda: clock[0])
+    return slept
+
+
+# --- parse_retry_after ---
+
+def test_parse_retry_after_seconds_and_garbage():
+    assert retry.parse_retry_after("7") == 7.0
+    assert retry.parse_retry_after("") is None
+    assert retry.parse_retry_after("soon") is None
+
+
+def test_parse_retry_after_http_date():
+    when = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60))
+    assert 50 < retry.parse_retry_after(when) <= 60
+
+
+# --- TokenBucket ---
+
+def test_bucket_allows_burst_without_waiting():
+    bucket = retry.TokenBucket(rate=1.0, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_bucket_waits_once_burst_is_spent(no_sleep):
+    bucket = retry.TokenBucket(rate=1.0, capacity=1)
+    bucket.acquire()
+    assert bucket.acquire(max_wait=10) == pytest.approx(1.0)
+    assert no_sleep == [pytest.approx(1.0)]
+
+
+def test_bucket_fails_fast_past_max_wait(no_sleep):
+    bucket = retry.TokenBucket(rate=0.1, capacity=1)
+    bucket.acquire()
+    with pytest.raises(retry.RateLimitedError):
+        bucket.acquire(max_wait=1.0)
+    assert no_sleep == []
+
+
+# --- CircuitBreaker ---
+
+def test_breaker_opens_after_threshold():
+    breaker = retry.CircuitBreaker(failure_threshold=2, reset_after=60)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(retry.CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_half_open_trial_closes_on_success():
+    breaker = retry.CircuitBreaker(failure_threshold=1, reset_after=0)
+    breaker.record_failure()
+    breaker.before_call()
+    # Only one trial call at a time
+    with pytest.raises(retry.CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_breaker_failed_trial_reopens():
+    breaker = retry.CircuitBreaker(failure_threshold=1, reset_after=60)
+    breaker.record_failure()
+    retry.time.sleep(60)
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(retry.CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_release_frees_trial_but_stays_open():
+    breaker = retry.CircuitBreaker(failure_threshold=1, reset_after=0)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker._opened_at is not None
+
+
+# --- Upstream.call ---
+
+def upstream(**kwargs):
+    kwargs.setdefault("rate", 1000.0)
+    kwargs.setdefault("burst", 100)
+    return retry.Upstream("test", **kwargs)
+
+
+def test_call_retries_retryable_errors(no_sleep):
+    fn = flaky(2)
+    assert upstream(max_attempts=3).call(fn) == "ok"
+    assert len(fn.calls) == 3
+    assert len(no_sleep) == 2
+
+
+def test_call_honors_retry_after(no_sleep):
+    fn = flaky(1, exc=lambda message: retry.RetryableError(message, retry_after=3.0))
+    upstream().call(fn)
+    assert no_sleep == [3.0]
+
+
+def test_call_gives_up_after_max_attempts():
+    fn = flaky(5)
+    with pytest.raises(retry.RetryError):
+        upstream(max_attempts=2).call(fn)
+    assert len(fn.calls) == 2
+
+
+def test_non_retryable_error_is_raised_and_leaves_breaker_unchanged():
+    service = upstream(max_attempts=1, failure_threshold=2)
+    with pytest.raises(retry.RetryError):
+        service.call(flaky(1))
+    with pytest.raises(Boom):
+        service.call(flaky(1, exc=Boom))
+    # Still one failure from before, so one more opens the circuit
+    with pytest.raises(retry.RetryError):
+        service.call(flaky(1))
+    with pytest.raises(retry.CircuitOpenError):
+        service.call(flaky(0))
+
+
+def test_call_fails_fast_when_rate_limited():
+    service = upstream(rate=0.01, burst=1, max_wait=1.0)
+    service.call(flaky(0))
+    fn = flaky(0)
+    with pytest.raises(retry.RateLimitedError):
+        service.call(fn)
+    assert fn.calls == []
+
+
+def test_shared_upstream_waits_instead_of_failing():
+    service = upstream(rate=4.0, burst=4, max_wait=0.0)
+    service.share(slots=None, workers=2)
+    assert (service.bucket.rate, service.bucket.capacity, service.max_wait) == (2.0, 2, None)
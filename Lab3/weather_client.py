@@ -0,0 +1,206 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+import gazetteer
+import perf
+import retry
+from cache import MISSING, TieredCache
+
+# --- Shared Open-Meteo client ---
+# Every weather page goes through this module so that all geocoding and
+# archive calls reuse one pooled, keep-alive session with the same timeouts.
+
+# Base URLs can be overridden (e.g. to point at standin_server.py)
+GEOCODING_URL = os.environ.get("OPEN_METEO_GEOCODING_URL", "https://geocoding-api.open-meteo.com") + "/v1/search"
+ARCHIVE_URL = os.environ.get("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com") + "/v1/archive"
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (5, 30)
+POOL_SIZE = 20
+
+# How long a resolved city stays cached (seconds); cities rarely move.
+GEOCODE_TTL = int(os.environ.get("GEOCODE_TTL", 30 * 24 * 3600))
+# Misses (typos, and every non-city word the chatbot fallback tries) expire much sooner
+GEOCODE_MISS_TTL = int(os.environ.get("GEOCODE_MISS_TTL", 3600))
+# Cap on the on-disk geocode table; the entries closest to expiry are dropped first
+GEOCODE_MAX_ENTRIES = int(os.environ.get("GEOCODE_MAX_ENTRIES", 20000))
+
+geocode_cache = TieredCache("geocode", ttl=GEOCODE_TTL, maxsize=4096, max_entries=GEOCODE_MAX_ENTRIES)
+
+_session = None
+
+
+class WeatherAPIError(Exception):
+    """Raised when an Open-Meteo request fails or returns an error payload."""
+
+
+def get_session():
+    """Returns the process-wide pooled requests.Session, creating it on first use."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+def close_session():
+    """Closes the pooled session; the next get_session() opens a fresh one."""
+    global _session
+    session, _session = _session, None
+    if session is not None:
+        session.close()
+
+
+def _get_json(url, params, upstream):
+    with perf.span(upstream) as span:
+        try:
+            response = retry.upstream(upstream).request(get_session(), "GET", url, params=params, timeout=TIMEOUT)
+        except (retry.RetryError, retry.CircuitOpenError, retry.RateLimitedError) as e:
+            raise WeatherAPIError(f"Request to {url} failed: {e}") from e
+        except requests.exceptions.RequestException as e:
+            raise WeatherAPIError(f"Request to {url} failed: {e}") from e
+        span.add_bytes(len(response.content))
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+    # Multi-location queries answer with a list, one object per location
+    error = data if isinstance(data, dict) else {}
+    if not response.ok or error.get("error"):
+        reason = error.get("reason") or f"status {response.status_code}"
+        raise WeatherAPIError(f"Open-Meteo error: {reason}")
+    return data
+
+
+# --- Geocoding ---
+
+def geocode(name, count=10):
+    """Returns the raw list of geocoding matches for a city name (may be empty)."""
+    data = _get_json(GEOCODING_URL, {"name": name, "count": count}, "open-meteo-geocoding")
+    return data.get("results") or []
+
+
+def best_match(results):
+    """Picks the most populated match, falling back to the first result."""
+    best = None
+    for c in results:
+        if c.get("population", 0) > (best or {}).get("population", 0):
+            best = c
+    if best is None and results:
+        best = results[0]
+    return best
+
+
+def normalize_city(name):
+    """Cache key for a city name: case-folded with whitespace collapsed."""
+    return " ".join(name.split()).casefold()
+
+
+def in_region(result, region):
+    """Whether a geocoding result lies in region, a country or US state as written after a city name."""
+    places = gazetteer.region_places(region)
+    if places:
+        return any(result.get("country_code") == code and (state is None or result.get("admin1") == state)
+                   for code, state in places)
+    region = normalize_city(region)
+    return region in (normalize_city(result.get("admin1") or ""), normalize_city(result.get("country") or ""))
+
+
+def resolve_city(name):
+    """
+    Geocodes a city and returns the population-ranked best match as a dict with
+    name, latitude, longitude and population, or None if nothing matched. A
+    qualified name like "Athens, Georgia" only matches places in that region.
+    Results are served from the geocode cache when possible; misses are cached
+    too, but only for GEOCODE_MISS_TTL.
+    """
+    key = normalize_city(name)
+    if not key:
+        return None
+    with perf.span("geocode", city=name) as span:
+        cached = geocode_cache.get(key)
+        if cached is not MISSING:
+            span.set(cache="hit")
+            return cached
+
+        span.set(cache="miss")
+        city, _, region = name.partition(",")
+        if region.strip():
+            match = best_match([r for r in geocode(city.strip()) if in_region(r, region)])
+        else:
+            match = best_match(geocode(name))
+        if match is not None:
+            match = {
+                "name": match.get("name", name),
+                "latitude": match["latitude"],
+                "longitude": match["longitude"],
+                "population": match.get("population", 0),
+            }
+        geocode_cache.set(key, match, ttl=None if match is not None else GEOCODE_MISS_TTL)
+        return match
+
+
+# --- Historical archive ---
+
+def projection(fields):
+    """
+    Turns the fields a page renders, e.g. ("daily.temperature_2m_mean",
+    "hourly.temperature_2m"), into the archive's daily=/hourly= arguments.
+    """
+    blocks = {"daily": [], "hourly": []}
+    for field in fields:
+        block, _, variable = field.partition(".")
+        if block not in blocks or not variable:
+            raise ValueError(f"Unknown archive field {field!r}; expected daily.<variable> or hourly.<variable>")
+        if variable not in blocks[block]:
+            blocks[block].append(variable)
+    return {block: tuple(variables) for block, variables in blocks.items()}
+
+
+def _archive_params(lat, lon, start_date, end_date, daily, hourly, unit, timezone, fields):
+    if fields:
+        wanted = projection(fields)
+        daily = tuple(dict.fromkeys(tuple(daily) + wanted["daily"]))
+        hourly = tuple(dict.fromkeys(tuple(hourly) + wanted["hourly"]))
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+    }
+    if daily:
+        params["daily"] = ",".join(daily)
+    if hourly:
+        params["hourly"] = ",".join(hourly)
+    if unit == "fahrenheit":
+        params["temperature_unit"] = "fahrenheit"
+    if timezone:
+        params["timezone"] = timezone
+    return params
+
+
+def archive(lat, lon, start_date, end_date, daily=(), hourly=(), unit="celsius", timezone=None, fields=None):
+    """
+    Queries the historical archive. Dates may be date objects or YYYY-MM-DD strings.
+    fields, if given, declares what the caller renders (see projection) and is
+    merged with daily/hourly, so only those variables are requested.
+    Returns the parsed JSON response (with "daily"/"hourly" blocks as requested).
+    """
+    params = _archive_params(lat, lon, start_date, end_date, daily, hourly, unit, timezone, fields)
+    return _get_json(ARCHIVE_URL, params, "open-meteo-archive")
+
+
+def archive_batch(locations, start_date, end_date, daily=(), hourly=(), unit="celsius", timezone=None, fields=None):
+    """
+    Queries the archive for several (lat, lon) locations in one request, using
+    comma-separated coordinates. Returns one response per location, in order.
+    """
+    lats = ",".join(str(lat) for lat, _ in locations)
+    lons = ",".join(str(lon) for _, lon in locations)
+    params = _archive_params(lats, lons, start_date, end_date, daily, hourly, unit, timezone, fields)
+    data = _get_json(ARCHIVE_URL, params, "open-meteo-archive")
+    # A single location comes back as a plain object rather than a list
+    return data if isinstance(data, list) else [data]